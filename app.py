@@ -1,10 +1,33 @@
 import streamlit as st
 import asyncio
+import atexit
 import os
-from src.reasoning import ReasoningAgent
+import json
+import time
+import uuid
+import logging
+import threading
+import hashlib
+import html
+import re
+from dataclasses import dataclass, asdict
+from src.reasoning import ReasoningAgent, AgentConfig
 from streamlit_agraph import agraph, Node, Edge, Config
 from src.graph import Neo4jManager
-from src.evaluation import RAGASEvaluator, EvaluationLogger
+from neo4j.exceptions import ClientError
+from src.evaluation import RAGASEvaluator, EvaluationLogger, EvaluationQueue
+from src.cache import SmartRAGCache, SemanticCache
+from src.store import ConversationStore
+
+# Optional Logfire instrumentation (only active when the package is installed)
+try:
+    import logfire
+    logfire.configure(send_to_logfire="if-token-present")
+except ImportError:
+    logfire = None
+
+logger = logging.getLogger(__name__)
+query_logger = logging.getLogger("medgraph.query")
 
 # Page Config
 st.set_page_config(
@@ -39,42 +62,162 @@ st.markdown("""
 st.title("🧬 MedGraph-RAG")
 st.caption("Hybrid Retrieval & Chain-of-Graph Reasoning System")
 
+@st.cache_resource
+def get_neo4j():
+    """One Neo4j driver per process; its Bolt pool is reused by every render and session."""
+    neo4j = Neo4jManager()
+    # Cached for the process lifetime, so the pool is closed once at interpreter exit
+    atexit.register(neo4j.close)
+    # No-ops once they exist; the evidence graph query relies on both
+    neo4j.create_entity_name_index()
+    neo4j.create_entity_name_lower_index()
+    neo4j.create_entity_fulltext_index()
+    return neo4j
+
+# Lifetime of cached answers, in memory and on disk
+CACHE_TTL_SECONDS = 900
+
+@st.cache_resource
+def get_store():
+    """SQLite store for chat history, cached results and timings, shared by all sessions."""
+    return ConversationStore("data/medgraph.db", max_age_seconds=CACHE_TTL_SECONDS)
+
+@st.cache_resource
+def get_cache():
+    """Process-wide cache of finished agent results, shared by all sessions."""
+    cache = SmartRAGCache(max_bytes=100 * 1024 * 1024, ttl_seconds=CACHE_TTL_SECONDS)
+    # Warm from results persisted by earlier runs that are still within the TTL (oldest first, so LRU order holds)
+    for query, variant, result, ts in reversed(get_store().recent_results(max_age_seconds=cache.ttl_seconds, limit=100)):
+        cache.put(query, result, variant=variant, stored_at=ts)
+    return cache
+
+@st.cache_resource
+def get_semantic_cache():
+    """Embedding-similarity cache for paraphrased questions, shared by all sessions."""
+    cache = SemanticCache(max_entries=10_000, ttl_seconds=CACHE_TTL_SECONDS)
+    # Warm from query embeddings persisted alongside the cached results (oldest first, so LRU order holds)
+    for query, variant, vector, result, ts in reversed(
+        get_store().recent_embedded_results(max_age_seconds=cache.ttl_seconds, limit=cache.max_entries)
+    ):
+        cache.put(vector, query, result, stored_at=ts, variant=variant)
+    return cache
+
+# RAGAS Evaluation Resources
+EVAL_BATCH_SIZE = 8
+EVAL_POLL_SECONDS = 2
+
+@st.cache_resource
+def get_evaluator():
+    """One RAGAS evaluator per process so its Gemini LLM and embedding clients are built once."""
+    return RAGASEvaluator()
+
+@st.cache_resource
+def get_eval_logger():
+    """Shared evaluation logger holding a single append handle on the CSV log."""
+    eval_logger = EvaluationLogger()
+    atexit.register(eval_logger.close)
+    return eval_logger
+
+@st.cache_resource
+def get_eval_queue():
+    """Background worker that scores queued turns in batches, shared by all sessions."""
+    return EvaluationQueue(get_evaluator(), get_eval_logger(), batch_size=EVAL_BATCH_SIZE)
+
+
 # Sidebar
 with st.sidebar:
     st.header("Configuration")
-    model_name = st.selectbox("Model", ["gemini-2.0-flash", ])
-    st.divider()
+    # Settings are batched in a form so adjusting a widget doesn't rerun the whole page;
+    # changes apply on submit
+    with st.form("settings_form", border=False):
+        model_name = st.selectbox("Model", ["gemini-2.0-flash", ])
+        rerank_enabled = st.checkbox(
+            "Rerank Retrieved Chunks",
+            value=AgentConfig.from_env().rerank_enabled,
+            help="Re-score retrieval candidates with a cross-encoder and keep the top 8 (RAG_RERANK_ENABLED)"
+        )
+        st.divider()
     
-    # RAGAS Evaluation Settings
-    st.subheader("🎯 RAGAS Evaluation")
-    enable_ragas = st.checkbox("Enable Real-time Evaluation", value=False, 
-                               help="Evaluate each answer using RAGAS metrics")
+        # RAGAS Evaluation Settings
+        st.subheader("🎯 RAGAS Evaluation")
+        enable_ragas = st.checkbox("Enable Real-time Evaluation", value=False, 
+                                   help="Evaluate each answer using RAGAS metrics")
     
-    if enable_ragas:
-        faithfulness_threshold = st.slider(
-            "Faithfulness Threshold",
-            min_value=0.0,
+        if enable_ragas:
+            faithfulness_threshold = st.slider(
+                "Faithfulness Threshold",
+                min_value=0.0,
+                max_value=1.0,
+                value=0.7,
+                step=0.05,
+                help="Minimum faithfulness score to consider answer as non-hallucinated"
+            )
+            show_metrics = st.checkbox("Show Detailed Metrics", value=True)
+            log_evaluations = st.checkbox("Log Evaluations", value=True,
+                                         help="Save evaluation results to CSV")
+    
+        st.divider()
+    
+        # Cache Settings
+        st.subheader("⚡ Caching")
+        semantic_threshold = st.slider(
+            "Semantic Cache Threshold",
+            min_value=0.80,
             max_value=1.0,
-            value=0.7,
-            step=0.05,
-            help="Minimum faithfulness score to consider answer as non-hallucinated"
+            value=0.95,
+            step=0.01,
+            help="Minimum cosine similarity for a paraphrased question to reuse a cached answer"
         )
-        show_metrics = st.checkbox("Show Detailed Metrics", value=True)
-        log_evaluations = st.checkbox("Log Evaluations", value=True,
-                                     help="Save evaluation results to CSV")
+        st.form_submit_button("Apply Settings", use_container_width=True)
     
     st.divider()
     
     st.info("System Status: **Active**")
     st.text(f"Backend: {model_name}")
+    cache_stats = get_cache().stats()
+    st.caption(
+        f"Answer cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+        f"{cache_stats['evictions']} evictions ({cache_stats['entries']} entries)"
+    )
+    semantic_stats = get_semantic_cache().stats()
+    st.caption(
+        f"Semantic cache: {semantic_stats['hits']} hits · {semantic_stats['misses']} misses "
+        f"({semantic_stats['entries']} entries)"
+    )
+    
+    # Opt-in, so an unreachable database doesn't slow every sidebar render
+    if st.toggle("Show Neo4j pool", value=False):
+        try:
+            pool_stats = get_neo4j().pool_stats()
+        except Exception as e:
+            pool_stats = {}
+            st.caption(f"Neo4j pool unavailable: {e}")
+        if pool_stats:
+            st.caption(f"Neo4j pool: {pool_stats['in_use']} in use · {pool_stats['idle']} idle")
+    
+    if st.button("Refresh Graph", help="Drop cached evidence-graph results after new data is ingested"):
+        st.session_state.refresh_graph = True  # consumed once load_evidence_graph is defined
     
     if st.button("Reset Chat"):
         st.session_state.messages = []
+        if "session_id" in st.session_state:
+            get_store().clear_messages(st.session_state.session_id)
         st.rerun()
 
 # Initialize State
+if "session_id" not in st.session_state:
+    # The id rides in the URL so a reopened tab picks its conversation back up
+    st.session_state.session_id = st.query_params.get("sid") or uuid.uuid4().hex
+    st.query_params["sid"] = st.session_state.session_id
 if "messages" not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = get_store().load_messages(st.session_state.session_id)
+
+def queue_query(query: str):
+    """
+    Button callback for sample and follow-up questions. Callbacks run before the
+    click's own rerun, which then answers the query; no extra st.rerun() frame.
+    """
+    st.session_state.pending_query = query
 
 # Sample Questions for Demo (only show when chat is empty)
 if len(st.session_state.messages) == 0:
@@ -92,19 +235,251 @@ if len(st.session_state.messages) == 0:
     cols = st.columns(2)
     for idx, question in enumerate(sample_questions):
         with cols[idx % 2]:
-            if st.button(f"💬 {question}", key=f"sample_{idx}", use_container_width=True):
-                # Store the selected query in session state
-                st.session_state.selected_sample_query = question
-                st.rerun()
+            st.button(f"💬 {question}", key=f"sample_{idx}", use_container_width=True,
+                      on_click=queue_query, args=(question,))
     
     st.divider()
 
+# RAGAS results arrive from the background queue; these read the sidebar's evaluation settings
+def render_evaluation(eval_result):
+    """Shows the RAGAS scores for one turn (detailed or compact, per the sidebar setting)."""
+    if "error" in eval_result:
+        st.error(f"Evaluation failed: {eval_result['error']}")
+        st.caption("The system will continue without evaluation metrics")
+        return
+    if eval_result.get("skipped"):
+        st.warning(f"⚠️ Not scored by RAGAS ({eval_result['skipped']}); both metrics recorded as 0")
+        return
+    
+    if show_metrics:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            faithfulness_score = eval_result.get('faithfulness', 0.0)
+            
+            # Color-code based on threshold
+            if faithfulness_score >= faithfulness_threshold:
+                st.success(f"**Faithfulness:** {faithfulness_score:.3f} ✅")
+                st.caption("Answer is well-grounded in the sources")
+            else:
+                st.error(f"**Faithfulness:** {faithfulness_score:.3f} ⚠️")
+                st.caption("Potential hallucination detected!")
+        
+        with col2:
+            relevancy_score = eval_result.get('answer_relevancy', 0.0)
+            
+            if relevancy_score >= 0.7:
+                st.success(f"**Answer Relevancy:** {relevancy_score:.3f} ✅")
+            elif relevancy_score >= 0.5:
+                st.warning(f"**Answer Relevancy:** {relevancy_score:.3f} ⚠️")
+            else:
+                st.error(f"**Answer Relevancy:** {relevancy_score:.3f} ❌")
+        
+        # Show detailed breakdown in expander
+        with st.expander("📊 Detailed Evaluation Metrics"):
+            st.json(eval_result)
+            
+            # Interpretation guide
+            st.markdown("""
+            **Metric Interpretation:**
+            - **Faithfulness (0-1):** Measures if the answer is factually consistent with the context. Higher is better.
+            - **Answer Relevancy (0-1):** Measures how well the answer addresses the question. Higher is better.
+            
+            **Thresholds:**
+            - ✅ Good: ≥ 0.7
+            - ⚠️ Moderate: 0.5 - 0.7
+            - ❌ Poor: < 0.5
+            """)
+    else:
+        # Compact view
+        faithfulness_score = eval_result.get('faithfulness', 0.0)
+        if faithfulness_score < faithfulness_threshold:
+            st.warning(f"⚠️ Low faithfulness score: {faithfulness_score:.3f}")
+        else:
+            st.success(f"✅ Faithfulness: {faithfulness_score:.3f}")
+
+@st.fragment(run_every=EVAL_POLL_SECONDS)
+def await_evaluation(eval_id):
+    """
+    Polls the queue without rerunning the page and draws the scores in place once they land,
+    so the answer panel streamed above it (citations, evidence graph, sources) stays on screen.
+    """
+    eval_result = get_eval_queue().result(eval_id)
+    if eval_result is None:
+        st.caption("⏳ Evaluating answer quality in the background...")
+    else:
+        render_evaluation(eval_result)
+
 # Display Chat History
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# Streamlit re-emits every element on each rerun, so only the most recent turns are
+# rendered by default; older ones stay behind a toggle.
+HISTORY_WINDOW = 20
+
+history_container = st.container()
+with history_container:
+    history = st.session_state.messages
+    hidden_count = len(history) - HISTORY_WINDOW
+    if hidden_count > 0 and not st.toggle(f"Show {hidden_count} earlier messages", key="show_full_history"):
+        history = history[hidden_count:]
+    for message in history:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+            if enable_ragas and message.get("eval_id"):
+                eval_result = get_eval_queue().result(message["eval_id"])
+                if eval_result is None:
+                    await_evaluation(message["eval_id"])
+                else:
+                    render_evaluation(eval_result)
 
 # Evidence Cloud: Render interactive graph
+EVIDENCE_MAX_TERMS = 1000
+# Less retrieved text than this can't hold a useful entity match, so the graph is skipped
+EVIDENCE_MIN_CHARS = 32
+# Shared agraph styling: matched entities red, discovered neighbours teal
+NODE_COLORS = {True: "#FF6B6B", False: "#4ECDC4"}
+NODE_FONT = {"color": "#FFFFFF", "size": 14, "strokeWidth": 2, "strokeColor": "#000000"}
+EDGE_FONT = {"color": "#F5F5F5", "size": 12, "strokeWidth": 1, "strokeColor": "#000"}
+
+EVIDENCE_MAX_ENTITIES = 30
+# Fallback scan (no full-text index): pages of entity names, at most as many as the old LIMIT 200
+ENTITY_PAGE_SIZE = 50
+ENTITY_SCAN_LIMIT = 200
+SIMPLE_NAME_PATTERN = re.compile(r"[a-z0-9]+( [a-z0-9]+)?")
+
+# Collects the relationships touching `entities`, least-connected pairs first
+EVIDENCE_RELATIONSHIPS = """
+RETURN entities,
+    COLLECT {
+        // One branch per side so each can seek on the name index instead of an OR scan
+        CALL {
+            WITH entities
+            MATCH (a:Entity)-[r]->(b:Entity) WHERE a.name IN entities
+            RETURN a, r, b
+            UNION
+            WITH entities
+            MATCH (a:Entity)-[r]->(b:Entity) WHERE b.name IN entities
+            RETURN a, r, b
+        }
+        // Fold parallel edges into one per pair; the graph draws a single labelled arrow anyway
+        WITH a, b, head(collect(CASE WHEN type(r) = 'RELATED_TO' THEN COALESCE(r.type, 'RELATED') ELSE type(r) END)) AS rel_type
+        // Prefer specific (low-degree) neighbours so a few hub entities can't use up the edge budget
+        WITH a, b, rel_type, COUNT { (a)--() } + COUNT { (b)--() } AS joint_degree
+        ORDER BY joint_degree ASC
+        RETURN {source: a.name, target: b.name, source_id: a.name_lower, target_id: b.name_lower, rel_type: rel_type}
+        LIMIT 60
+    } AS relationships
+"""
+
+# One round trip for the entities whose whole name occurs in the retrieved text
+# (case-insensitive, first spelling wins) and the relationships touching them.
+# Names of one or two plain words are exact index seeks on name_lower, one per word
+# gram; longer or punctuated names come from the full-text index and are confirmed
+# with a substring check.
+EVIDENCE_QUERY = """
+CALL {
+    UNWIND $grams AS gram
+    MATCH (e:Entity {name_lower: gram})
+    RETURN e
+    UNION
+    CALL db.index.fulltext.queryNodes('entityNameFts', $terms) YIELD node AS e
+    WITH e, e.name_lower AS entity_lower LIMIT 500
+    WITH e, entity_lower WHERE NOT entity_lower =~ '[a-z0-9]+( [a-z0-9]+)?' AND $content CONTAINS entity_lower
+    RETURN e
+}
+WITH e, e.name_lower AS entity_lower WHERE size(entity_lower) > 2
+WITH entity_lower, head(collect(e.name)) AS entity_name
+WITH collect(entity_name)[..$max_entities] AS entities
+""" + EVIDENCE_RELATIONSHIPS
+
+# Fallback path: entity names are paged through in Python, then their relationships fetched
+ENTITY_SCAN_QUERY = "MATCH (e:Entity) RETURN e.name AS entity_name SKIP $skip LIMIT $limit"
+EVIDENCE_RELATIONSHIPS_FOR_ENTITIES = "WITH $entities AS entities" + EVIDENCE_RELATIONSHIPS
+
+
+def scan_evidence_entities(session, all_content: str, grams) -> list:
+    """
+    Fallback for when the entityNameFts index is unavailable: pages through entity
+    names and applies the same whole-name check in Python, stopping once enough match.
+    """
+    matched_entities = []
+    seen = set()
+    for skip in range(0, ENTITY_SCAN_LIMIT, ENTITY_PAGE_SIZE):
+        rows = session.run(ENTITY_SCAN_QUERY, skip=skip, limit=ENTITY_PAGE_SIZE).data()
+        for row in rows:
+            entity = row["entity_name"]
+            if not entity or len(entity) <= 2:
+                continue
+            entity_lower = entity.lower()
+            found = entity_lower in grams if SIMPLE_NAME_PATTERN.fullmatch(entity_lower) else entity_lower in all_content
+            if found and entity_lower not in seen:
+                seen.add(entity_lower)
+                matched_entities.append(entity)
+        if len(rows) < ENTITY_PAGE_SIZE or len(matched_entities) >= EVIDENCE_MAX_ENTITIES:
+            break
+    return matched_entities[:EVIDENCE_MAX_ENTITIES]
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_evidence_graph(all_content: str):
+    """
+    Returns (entities, node rows, edge rows, used_fallback) for the lowercased retrieved
+    text as plain tuples; used_fallback is True when the full-text index was unavailable
+    and entity names were scanned instead. Cached for five minutes per text, so reruns (citation clicks, repeated
+    questions) skip both the Neo4j query and the row processing; ingestion runs in a
+    separate process, hence expiry rather than explicit clearing.
+    """
+    # Word 1- and 2-grams of the text; names made of plain words are matched by set membership
+    words = re.findall(r"[a-z0-9]+", all_content)
+    grams = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+    
+    # Lucene clause limit is 1024; distinct content terms are capped well below it
+    terms = sorted(w for w in set(words) if len(w) >= 3)[:EVIDENCE_MAX_TERMS]
+    if not terms:
+        return [], [], [], False
+    
+    used_fallback = False
+    neo4j = get_neo4j()
+    with neo4j.driver.session(database=neo4j.database) as session:
+        try:
+            record = session.run(
+                EVIDENCE_QUERY, terms=" OR ".join(terms), grams=[g for g in grams if len(g) > 2], content=all_content,
+                max_entities=EVIDENCE_MAX_ENTITIES
+            ).single()
+        except ClientError as e:
+            logger.warning("Full-text entity lookup failed, scanning entity names instead: %s", e)
+            used_fallback = True
+            entities = scan_evidence_entities(session, all_content, grams)
+            record = session.run(EVIDENCE_RELATIONSHIPS_FOR_ENTITIES, entities=entities).single()
+    if record is None:
+        return [], [], [], used_fallback
+    
+    matched_entities = record["entities"]
+    matched_set = frozenset(e.lower() for e in matched_entities)
+    
+    # Collect rows (deduplicated by lowercase; first appearance fixes label and size)
+    raw_nodes = {}  # lowercase id -> (label, size)
+    edge_rows = []  # (source id, target id, relationship type)
+    for rel in record["relationships"]:
+        source = rel["source"]
+        target = rel["target"]
+        rel_type = rel.get("rel_type", "RELATED") or "RELATED"
+        
+        # Lowercased at ingest (name_lower), so ids need no per-row string work
+        source_lower = rel["source_id"]
+        target_lower = rel["target_id"]
+        raw_nodes.setdefault(source_lower, (source, 30))
+        raw_nodes.setdefault(target_lower, (target, 50))
+        edge_rows.append((source_lower, target_lower, rel_type))
+    
+    node_rows = [
+        (node_id, label, size, node_id in matched_set)
+        for node_id, (label, size) in raw_nodes.items()
+    ]
+    return matched_entities, node_rows, edge_rows, used_fallback
+
+if st.session_state.pop("refresh_graph", False):
+    load_evidence_graph.clear()
+
+
 def render_evidence_graph(context):
     """
     Creates an interactive graph visualization of entities and relationships
@@ -119,50 +494,26 @@ def render_evidence_graph(context):
         display_node_details(st.session_state.selected_node, context)
         return
     
-    neo4j = Neo4jManager()
-    
-    # Combine all retrieved content (lowercase for matching)
-    all_content = " ".join([doc.get("content", "") for doc in context]).lower()
-    
-    if not all_content.strip():
+    # Check the size before building the joined, lowercased copy
+    if sum(len(doc.get("content") or "") for doc in context) < EVIDENCE_MIN_CHARS:
         st.info("No content to analyze for entities.")
-        neo4j.close()
         return
     
-    # Query all entities from the graph
-    entity_query = """
-    MATCH (e:Entity)
-    RETURN e.name as entity_name
-    LIMIT 200
-    """
-    
-    matched_entities = []
-    entity_canonical = {}  # Map lowercase -> original case
+    # Combine all retrieved content (lowercase for matching); overlapping retrievals
+    # often return the same chunk several times, so each distinct text is joined once
+    all_content = " ".join(dict.fromkeys(doc.get("content") or "" for doc in context)).lower()
     
     try:
-        with neo4j.driver.session() as session:
-            result = session.run(entity_query)
-            all_entities = [r["entity_name"] for r in result]
-            
-            # Filter to entities that appear in the content
-            # Fix case sensitivity: use lowercase for matching, keep first occurrence
-            for entity in all_entities:
-                if entity and len(entity) > 2:
-                    entity_lower = entity.lower()
-                    if entity_lower in all_content and entity_lower not in entity_canonical:
-                        entity_canonical[entity_lower] = entity
-                        matched_entities.append(entity)
-            
-            matched_entities = matched_entities[:30]
-            
+        matched_entities, node_rows, edge_rows, used_fallback = load_evidence_graph(all_content)
     except Exception as e:
         st.warning(f"Could not fetch entities: {e}")
-        neo4j.close()
         return
     
+    if used_fallback:
+        st.caption("Entity full-text index unavailable; entities were matched with a slower name scan.")
+    
     if not matched_entities:
         st.info("No graph entities found in the retrieved content.")
-        neo4j.close()
         return
     
     # Add legend
@@ -181,78 +532,16 @@ def render_evidence_graph(context):
     
     st.caption(f"Found {len(matched_entities)} entities: {', '.join(matched_entities[:5])}{'...' if len(matched_entities) > 5 else ''}")
     
-    # Query 2: Find relationships with ACTUAL relationship types
-    relationship_query = """
-    MATCH (a:Entity)-[r]->(b:Entity)
-    WHERE (a.name IN $entities OR b.name IN $entities)
-    AND type(r) <> 'RELATED_TO'
-    RETURN a.name as source, b.name as target, type(r) as rel_type
-    LIMIT 30
-    UNION ALL
-    MATCH (a:Entity)-[r:RELATED_TO]->(b:Entity)
-    WHERE (a.name IN $entities OR b.name IN $entities)
-    RETURN a.name as source, b.name as target, COALESCE(r.type, 'RELATED') as rel_type
-    LIMIT 30
-    """
-    
-    nodes = []
-    edges = []
-    node_set = set()  # Use lowercase for deduplication
-    node_display = {}  # lowercase -> display name
-    matched_set = set([e.lower() for e in matched_entities])
-    
-    try:
-        with neo4j.driver.session() as session:
-            result = session.run(relationship_query, entities=matched_entities)
-            
-            for record in result:
-                source = record["source"]
-                target = record["target"]
-                rel_type = record.get("rel_type", "RELATED") or "RELATED"
-                
-                source_lower = source.lower()
-                target_lower = target.lower()
-                
-                # Deduplicate by lowercase
-                if source_lower not in node_set:
-                    color = "#FF6B6B" if source_lower in matched_set else "#4ECDC4"
-                    nodes.append(Node(
-                        id=source_lower, 
-                        label=source, 
-                        size=30,
-                        color=color,
-                        font={"color": "#FFFFFF", "size": 14, "strokeWidth": 2, "strokeColor": "#000000"}
-                    ))
-                    node_set.add(source_lower)
-                    node_display[source_lower] = source
-                    
-                if target_lower not in node_set:
-                    color = "#FF6B6B" if target_lower in matched_set else "#4ECDC4"
-                    nodes.append(Node(
-                        id=target_lower, 
-                        label=target, 
-                        size=50,
-                        color=color,
-                        font={"color": "#FFFFFF", "size": 14, "strokeWidth": 2, "strokeColor": "#000000"}
-                    ))
-                    node_set.add(target_lower)
-                    node_display[target_lower] = target
-                
-                # Add edge with actual relationship type
-                edges.append(Edge(
-                    source=source_lower, 
-                    target=target_lower, 
-                    label=rel_type,
-                    color="#FFD93D",
-                    font={"color": "#F5F5F5", "size": 12, "strokeWidth": 1, "strokeColor": "#000"}
-                ))
-    
-    except Exception as e:
-        st.warning(f"Could not fetch relationships: {e}")
-        neo4j.close()
-        return
-    finally:
-        neo4j.close()
+    # Only the agraph object construction happens per render
+    nodes = [
+        Node(id=node_id, label=label, size=size, color=NODE_COLORS[matched], font=NODE_FONT)
+        for node_id, label, size, matched in node_rows
+    ]
+    # Add edges with actual relationship type
+    edges = [
+        Edge(source=source, target=target, label=rel_type, color="#FFD93D", font=EDGE_FONT)
+        for source, target, rel_type in edge_rows
+    ]
     
     if not nodes:
         st.info(f"No relationships found for the {len(matched_entities)} entities.")
@@ -276,9 +565,83 @@ def render_evidence_graph(context):
     # Handle node selection
     if selected and isinstance(selected, str):
         st.session_state.selected_node = selected
+        st.session_state.pop("mention_limit", None)
         st.rerun()
 
 
+CITATION_PATTERN = re.compile(r"\[(\d+)\]")
+
+@st.cache_data(max_entries=256)
+def parse_citations(answer: str):
+    """Distinct citation numbers in an answer, in numeric order; cached so citation-click reruns skip the regex."""
+    return sorted({int(c) for c in CITATION_PATTERN.findall(answer)})
+
+
+def group_sources(context):
+    """
+    Collapses chunks with identical content and groups the rest by paper.
+    Returns {doc_title: [(source_numbers, doc), ...]}; source numbers are the
+    1-based positions used by the answer's citation markers.
+    """
+    seen = {}
+    groups = {}
+    for number, doc in enumerate(context, 1):
+        key = hashlib.blake2b(doc.get("content", "").encode("utf-8"), digest_size=16).digest()
+        if key in seen:
+            seen[key][0].append(number)
+            continue
+        entry = ([number], doc)
+        seen[key] = entry
+        doc_title = doc.get("metadata", {}).get("doc_title", "Unknown")
+        groups.setdefault(doc_title, []).append(entry)
+    return groups
+
+
+@st.cache_data(max_entries=256)
+def format_sources_html(context_json: str) -> str:
+    """
+    Renders the grouped source list as collapsible <details> blocks in one string,
+    cached per context so reruns (e.g. citation clicks) emit a single element
+    instead of an expander and three widgets per chunk.
+    """
+    blocks = []
+    for doc_title, entries in group_sources(json.loads(context_json)).items():
+        items = []
+        for source_numbers, doc in entries:
+            labels = ", ".join(f"[{n}]" for n in source_numbers)
+            section_title = doc.get("metadata", {}).get("section_title", "Unknown")
+            # Newlines as entities: a blank line would end the HTML block in the Markdown parser
+            content = html.escape(doc.get("content") or "").replace("\n", "&#10;")
+            items.append(
+                f"<p><strong>Source {labels}</strong><br>"
+                f"<small>Section: {html.escape(str(section_title))}</small></p>"
+                f"<pre style=\"white-space: pre-wrap;\">{content}</pre>"
+            )
+        summary = f"{doc_title} ({len(entries)} {'chunk' if len(entries) == 1 else 'chunks'})"
+        blocks.append(f"<details><summary>{html.escape(summary)}</summary>{''.join(items)}</details>")
+    return "\n".join(blocks)
+
+
+MENTIONS_PAGE_SIZE = 5
+
+# Node header and both relationship directions in one round trip;
+# the anchor is a seek on the lowercased-name index
+NODE_DETAILS_QUERY = """
+MATCH (n:Entity {name_lower: $node_id})
+WITH n LIMIT 1
+RETURN n.name AS actual_name,
+    COLLECT {
+        MATCH (n)-[r]->(related:Entity)
+        RETURN {rel_type: type(r), target: related.name}
+        LIMIT 50
+    } AS outgoing,
+    COLLECT {
+        MATCH (related:Entity)-[r]->(n)
+        RETURN {rel_type: type(r), source: related.name}
+        LIMIT 50
+    } AS incoming
+"""
+
 def display_node_details(node_id, context):
     """
     Display detailed information about a selected node with a back button.
@@ -286,39 +649,18 @@ def display_node_details(node_id, context):
     # Back button at the top
     if st.button("⬅️ Back to Graph", type="primary"):
         st.session_state.selected_node = None
+        st.session_state.pop("mention_limit", None)
         st.rerun()
     
     st.divider()
     
-    neo4j = Neo4jManager()
+    neo4j = get_neo4j()
     
     try:
-        # Query node details and relationships
-        node_query = """
-        MATCH (n:Entity {name: $node_name})
-        OPTIONAL MATCH (n)-[r]->(related:Entity)
-        RETURN n.name as name, 
-               collect(DISTINCT {target: related.name, relationship: type(r)}) as outgoing
-        UNION
-        MATCH (n:Entity {name: $node_name})
-        OPTIONAL MATCH (related:Entity)-[r]->(n)
-        RETURN n.name as name,
-               collect(DISTINCT {source: related.name, relationship: type(r)}) as incoming
-        """
-        
-        with neo4j.driver.session() as session:
-            # Try to find the node by case-insensitive match
-            result = session.run("""
-                MATCH (n:Entity)
-                WHERE toLower(n.name) = toLower($node_id)
-                RETURN n.name as actual_name
-                LIMIT 1
-            """, node_id=node_id)
-            
-            record = result.single()
+        with neo4j.driver.session(database=neo4j.database) as session:
+            record = session.run(NODE_DETAILS_QUERY, node_id=node_id.lower()).single()
             if not record:
                 st.error(f"Node '{node_id}' not found in the graph.")
-                neo4j.close()
                 return
             
             actual_name = record["actual_name"]
@@ -329,23 +671,8 @@ def display_node_details(node_id, context):
             
             st.divider()
             
-            # Get relationships
-            outgoing_result = session.run("""
-                MATCH (n:Entity)-[r]->(related:Entity)
-                WHERE toLower(n.name) = toLower($node_id)
-                RETURN type(r) as rel_type, related.name as target
-                LIMIT 50
-            """, node_id=node_id)
-            
-            incoming_result = session.run("""
-                MATCH (related:Entity)-[r]->(n:Entity)
-                WHERE toLower(n.name) = toLower($node_id)
-                RETURN type(r) as rel_type, related.name as source
-                LIMIT 50
-            """, node_id=node_id)
-            
-            outgoing = list(outgoing_result)
-            incoming = list(incoming_result)
+            outgoing = record["outgoing"]
+            incoming = record["incoming"]
             
             # Display relationships in two columns
             col1, col2 = st.columns(2)
@@ -371,48 +698,245 @@ def display_node_details(node_id, context):
             # Display related content from context
             st.markdown("### 📄 Mentions in Retrieved Sources")
             mentions_found = False
+            # Mentions are shown a page at a time; scanning stops once the page is full
+            mention_limit = st.session_state.get("mention_limit", MENTIONS_PAGE_SIZE)
+            more_mentions = False
+            # One case-insensitive pattern both finds and highlights mentions, without lowercased copies of each doc
+            name_pattern = re.compile(re.escape(actual_name), re.IGNORECASE)
+            shown = 0
             for idx, doc in enumerate(context):
-                content = doc.get("content", "").lower()
-                if actual_name.lower() in content:
+                content = doc.get("content", "")
+                if shown == mention_limit:
+                    more_mentions = bool(name_pattern.search(content))
+                    if more_mentions:
+                        break
+                    continue
+                highlighted_content, mention_count = name_pattern.subn(r"**\g<0>**", content)
+                if mention_count:
                     mentions_found = True
+                    shown += 1
                     with st.expander(f"Source {idx+1}: {doc.get('metadata', {}).get('doc_title', 'Unknown')}"):
                         st.caption(f"Section: {doc.get('metadata', {}).get('section_title', 'Unknown')}")
                         # Highlight the entity in the content
-                        highlighted_content = doc.get("content", "").replace(
-                            actual_name, 
-                            f"**{actual_name}**"
-                        )
                         st.markdown(highlighted_content)
             
+            if more_mentions and st.button("Load more mentions"):
+                st.session_state.mention_limit = mention_limit + MENTIONS_PAGE_SIZE
+                st.rerun()
+            
             if not mentions_found:
                 st.info(f"'{actual_name}' was not directly mentioned in the retrieved sources, but is connected through the knowledge graph.")
             
     except Exception as e:
         st.error(f"Error loading node details: {e}")
-    finally:
-        neo4j.close()
 
 
-# Reasoning Agent Wrapper
-async def run_agent(query: str):
-    agent = ReasoningAgent()
-    
-    # We want to capture the intermediate steps (Reasoning Traces)
-    # The current agent.run() returns a final dict. 
-    # To stream steps in a real app, we'd need to use agent.graph.astream()
-    # For this prototype, we'll run it and display the traces from the result dict.
+@st.cache_resource
+def warm_query_plans():
+    """
+    Runs the evidence-graph and node-detail queries once with throwaway parameters,
+    in the background, so Neo4j has their plans cached (keyed by query text) before
+    the first real render or node click.
+    """
+    def run():
+        warmup_queries = [
+            (EVIDENCE_QUERY, {"terms": "__warmup__", "grams": [], "content": "", "max_entities": EVIDENCE_MAX_ENTITIES}),
+            (EVIDENCE_RELATIONSHIPS_FOR_ENTITIES, {"entities": [""]}),
+            (ENTITY_SCAN_QUERY, {"skip": 0, "limit": 1}),
+            (NODE_DETAILS_QUERY, {"node_id": "__warmup__"}),
+        ]
+        try:
+            neo4j = get_neo4j()
+            with neo4j.driver.session(database=neo4j.database) as session:
+                for query, params in warmup_queries:
+                    try:
+                        session.run(query, **params).consume()
+                    except ClientError as e:
+                        logger.info("Skipping query plan warmup: %s", e)
+        except Exception as e:
+            logger.warning("Query plan warmup failed: %s", e)
     
-    return await agent.run(query)
+    threading.Thread(target=run, daemon=True).start()
+
+warm_query_plans()
+
+
+# Reasoning Agent Wrapper
+@st.cache_resource
+def get_event_loop():
+    """
+    One process-wide event loop running in a daemon thread. The agent's async Neo4j
+    pool is bound to the loop it was first used on, so every session submits here.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
 
-# Handle sample query clicks (auto-submit)
-if "selected_sample_query" in st.session_state and st.session_state.selected_sample_query:
-    prompt = st.session_state.selected_sample_query
-    st.session_state.selected_sample_query = None  # Clear it
+
+@st.cache_resource
+def get_agent():
+    """Builds the ReasoningAgent once per process so LLM and Neo4j clients are reused across turns."""
+    # Shares the cached manager's sync pool instead of opening a second one
+    neo4j = get_neo4j()
+    agent = ReasoningAgent(config=AgentConfig.from_env(), neo4j=neo4j)
+    # The async pool is bound to the shared loop, so it is closed there. atexit runs
+    # handlers last-in first-out, so this precedes get_neo4j's close of the sync pool.
+    loop = get_event_loop()
+    atexit.register(lambda: asyncio.run_coroutine_threadsafe(agent.aclose(), loop).result(timeout=5))
+    if agent.config.warmup:
+        # Warm the Neo4j pool, embedding and LLM clients in the background
+        asyncio.run_coroutine_threadsafe(agent.warmup(), loop)
+    return agent
+
+# Build (and optionally warm) the agent at startup instead of on the first question
+if AgentConfig.from_env().warmup:
+    get_agent()
+
+
+async def stream_agent(query: str, rerank_enabled: bool = None):
+    """Streams the agent's execution events as each graph node completes."""
+    if logfire is None:
+        async for event in get_agent().astream(query, rerank_enabled=rerank_enabled):
+            yield event
+        return
     
-    # Store as pending query to be processed below
-    st.session_state.pending_query = prompt
+    with logfire.span("stream_agent {query}", query=query):
+        async for event in get_agent().astream(query, rerank_enabled=rerank_enabled):
+            yield event
+
+
+def iterate_agent(query: str, rerank_enabled: bool = None):
+    """Drives the async stream_agent generator from Streamlit's synchronous script run."""
+    loop = get_event_loop()
+    stream = stream_agent(query, rerank_enabled)
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(anext(stream), loop).result()
+        except StopAsyncIteration:
+            break
+
+
+@dataclass
+class Timings:
+    """Per-phase latency breakdown for one answered query, in milliseconds."""
+    t_embed_ms: float = 0.0
+    t_search_ms: float = 0.0
+    t_rerank_ms: float = 0.0
+    t_llm_ms: float = 0.0
+    total_ms: float = 0.0
+
+    @classmethod
+    def from_events(cls, execution_events, total_ms: float) -> "Timings":
+        timings = cls(total_ms=round(total_ms, 1))
+        for event in execution_events:
+            elapsed_ms = event.get("execution_time", 0) * 1000
+            event_type = event.get("type")
+            if event_type == "tool_call":
+                embed_ms = event.get("embed_time", 0) * 1000
+                timings.t_embed_ms += embed_ms
+                timings.t_search_ms += elapsed_ms - embed_ms
+            elif event_type == "rerank":
+                timings.t_rerank_ms += elapsed_ms
+            elif event_type in ("plan_created", "reflection", "final_answer"):
+                timings.t_llm_ms += elapsed_ms
+        for field in ("t_embed_ms", "t_search_ms", "t_rerank_ms", "t_llm_ms"):
+            setattr(timings, field, round(getattr(timings, field), 1))
+        return timings
+
+
+def log_query_timings(query: str, timings: Timings, cached: bool):
+    """Emits one structured log line per answered query."""
+    record = {
+        "event": "query_complete",
+        "tenant_id": st.session_state.get("session_id"),
+        "query": query,
+        "cached": cached,
+        **asdict(timings),
+    }
+    query_logger.info(json.dumps(record))
+    get_store().log_timings(record["tenant_id"], query, cached, asdict(timings))
+    if logfire is not None:
+        logfire.info("query_complete", **record)
+
+
+@st.cache_data(max_entries=256)
+def format_plan_markdown(events_json: str) -> str:
+    """Pre-formats the planning trace; keyed on the serialized events so unchanged plans are served from cache."""
+    blocks = []
+    for event in json.loads(events_json):
+        # Display the plan as-is (it's now a single string)
+        plan_content = event.get("plan", "")
+        if isinstance(plan_content, list):
+            # Fallback for old format
+            plan_content = "\n".join(plan_content)
+        blocks.append(f"**Generated Plan:**\n\n{plan_content}\n\n:gray[⏱️ {event.get('timestamp', 'N/A')}]")
+    return "\n\n".join(blocks)
+
+
+def render_plan_section(plan_events):
+    with st.expander("📋 Planning", expanded=False):
+        st.markdown(format_plan_markdown(json.dumps(plan_events, default=str)))
+
+
+def render_tool_section(tool_events):
+    with st.expander("🔧 Tool Execution", expanded=False):
+        for i, event in enumerate(tool_events, 1):
+            st.markdown(f"**Tool {i}: {event.get('tool_name', 'Unknown')}**")
+            
+            # Display metrics in columns
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Results", event.get("result_count", 0))
+            with col2:
+                st.metric("Time (s)", f"{event.get('execution_time', 0):.3f}")
+            with col3:
+                st.caption(f"⏱️ {event.get('timestamp', 'N/A')}")
+            
+            # Show query details
+            with st.expander(f"Query Details - Tool {i}"):
+                st.text("Query:")
+                st.code(event.get("query", "N/A"))
+                st.text("Cypher:")
+                st.code(event.get("cypher", "N/A"), language="cypher")
+                if "error" in event:
+                    st.error(f"Error: {event['error']}")
+            
+            st.divider()
+
+
+def render_reflection_section(reflection_events):
+    with st.expander("🤔 Reflection", expanded=False):
+        for event in reflection_events:
+            decision = event.get("decision", "UNKNOWN")
+            context_count = event.get("context_count", 0)
+            
+            if "YES" in decision:
+                st.success(f"✅ Sufficient information ({context_count} context items)")
+            else:
+                st.warning(f"⚠️ Need more information ({context_count} context items)")
+            
+            st.caption(f"⏱️ {event.get('timestamp', 'N/A')}")
+
+
+@st.cache_data(max_entries=256)
+def format_answer_markdown(events_json: str) -> str:
+    return "\n\n".join(
+        f"**Answer Length:** {event.get('answer_length', 0)} characters\n\n:gray[⏱️ {event.get('timestamp', 'N/A')}]"
+        for event in json.loads(events_json)
+    )
+
+
+def render_answer_section(answer_events):
+    with st.expander("💡 Answer Generation", expanded=False):
+        st.markdown(format_answer_markdown(json.dumps(answer_events, default=str)))
+
 
-# Check for pending query (from sample questions or suggestions)
+# Streaming answer redraw limits (see the answer_token handler below)
+STREAM_FLUSH_SECONDS = 0.05
+STREAM_FLUSH_CHARS = 40
+
+
+# Check for pending query (queued by sample-question and follow-up buttons)
 pending_prompt = st.session_state.pop("pending_query", None)
 
 # Always render chat input (must call to display it)
@@ -424,89 +948,115 @@ prompt = pending_prompt if pending_prompt else chat_input
 if prompt:
     # Add User Message
     st.session_state.messages.append({"role": "user", "content": prompt})
+    get_store().add_message(st.session_state.session_id, "user", prompt)
     with st.chat_message("user"):
         st.markdown(prompt)
 
     # Generate Response
     with st.chat_message("assistant"):
         with st.status("🧠 Analyzing your question and searching the knowledge graph...", expanded=True) as status:
-            st.write("🔍 Retrieving relevant medical information...")
+            # One placeholder per trace section, filled in as the agent streams events
+            plan_ph, tool_ph, refl_ph, ans_ph = st.empty(), st.empty(), st.empty(), st.empty()
+            stream_ph = st.empty()
             
-            # Run the agent (Async wrapper for streamlit)
             try:
-                result = asyncio.run(run_agent(prompt))
-                # Store result in session state so it persists across reruns
-                st.session_state.last_result = result
+                plan_events, tool_events, reflection_events, answer_events = [], [], [], []
+                streamed_answer = ""
+                # Token deltas are coalesced so the placeholder is redrawn at most ~20x/s
+                flushed_len, last_flush = 0, time.monotonic()
+                result = {}
                 
-                # Display execution events in structured sections
-                execution_events = result.get("execution_events", [])
+                # Timed from before the cache lookups, so hits report what this request actually took
+                start_time = time.perf_counter()
                 
-                # Group events by type
-                plan_events = [e for e in execution_events if e.get("type") == "plan_created"]
-                tool_events = [e for e in execution_events if e.get("type") == "tool_call"]
-                reflection_events = [e for e in execution_events if e.get("type") == "reflection"]
-                answer_events = [e for e in execution_events if e.get("type") == "final_answer"]
+                # Repeat questions replay the cached trace instead of re-running the agent;
+                # results with and without reranking are cached separately
+                cache_variant = "rerank" if rerank_enabled else "no-rerank"
+                cached_result = get_cache().get(prompt, variant=cache_variant)
+                query_embedding = None
+                if cached_result is not None:
+                    st.write("⚡ Served from cache")
+                else:
+                    # Second tier: near-duplicate questions by embedding similarity.
+                    # An embedding failure only skips this tier; the agent still answers.
+                    try:
+                        query_embedding = get_agent().embed(prompt)
+                    except Exception as e:
+                        logger.warning("Query embedding failed, skipping semantic cache: %s", e)
+                    if query_embedding is not None:
+                        semantic_hit = get_semantic_cache().get(
+                            query_embedding, threshold=semantic_threshold, variant=cache_variant
+                        )
+                        if semantic_hit is not None:
+                            cached_result, similarity = semantic_hit
+                            st.write(f"⚡ Served from semantic cache (similarity {similarity:.2f})")
                 
-                # 1. Planning Section
-                if plan_events:
-                    with st.expander("📋 Planning", expanded=False):
-                        for event in plan_events:
-                            st.markdown("**Generated Plan:**")
-                            # Display the plan as-is (it's now a single string)
-                            plan_content = event.get("plan", "")
-                            if isinstance(plan_content, list):
-                                # Fallback for old format
-                                plan_content = "\n".join(plan_content)
-                            st.markdown(plan_content)
-                            st.caption(f"⏱️ {event.get('timestamp', 'N/A')}")
-
+                if cached_result is not None:
+                    events = [*cached_result.get("execution_events", []), {"type": "result", "result": cached_result}]
+                else:
+                    st.write("🔍 Retrieving relevant medical information...")
+                    events = iterate_agent(prompt, rerank_enabled)
                 
-                # 2. Tool Execution Section
-                if tool_events:
-                    with st.expander("🔧 Tool Execution", expanded=False):
-                        for i, event in enumerate(tool_events, 1):
-                            st.markdown(f"**Tool {i}: {event.get('tool_name', 'Unknown')}**")
-                            
-                            # Display metrics in columns
-                            col1, col2, col3 = st.columns(3)
-                            with col1:
-                                st.metric("Results", event.get("result_count", 0))
-                            with col2:
-                                st.metric("Time (s)", f"{event.get('execution_time', 0):.3f}")
-                            with col3:
-                                st.caption(f"⏱️ {event.get('timestamp', 'N/A')}")
-                            
-                            # Show query details
-                            with st.expander(f"Query Details - Tool {i}"):
-                                st.text("Query:")
-                                st.code(event.get("query", "N/A"))
-                                st.text("Cypher:")
-                                st.code(event.get("cypher", "N/A"), language="cypher")
-                                if "error" in event:
-                                    st.error(f"Error: {event['error']}")
-                            
-                            st.divider()
+                for event in events:
+                    event_type = event.get("type")
+                    if event_type == "plan_created":
+                        plan_events.append(event)
+                        with plan_ph.container():
+                            render_plan_section(plan_events)
+                        status.update(label="🔍 Retrieving evidence for each plan step...")
+                    elif event_type == "tool_call":
+                        tool_events.append(event)
+                        with tool_ph.container():
+                            render_tool_section(tool_events)
+                    elif event_type == "reflection":
+                        reflection_events.append(event)
+                        with refl_ph.container():
+                            render_reflection_section(reflection_events)
+                        if "YES" in event.get("decision", ""):
+                            status.update(label="✍️ Writing the answer...")
+                    elif event_type == "final_answer":
+                        answer_events.append(event)
+                        with ans_ph.container():
+                            render_answer_section(answer_events)
+                    elif event_type == "tool_batch":
+                        st.write(
+                            f"⚡ Ran {event.get('steps', 0)} plan steps concurrently: "
+                            f"{event.get('wall_time', 0):.2f}s wall vs {event.get('summed_time', 0):.2f}s summed"
+                        )
+                    elif event_type == "rerank":
+                        st.write(f"🔀 Reranked {event.get('candidates', 0)} candidates → kept {event.get('kept', 0)}")
+                    elif event_type == "answer_token":
+                        if not streamed_answer:
+                            status.update(label="✍️ Writing the answer...")
+                        streamed_answer += event["content"]
+                        if (time.monotonic() - last_flush > STREAM_FLUSH_SECONDS
+                                or len(streamed_answer) - flushed_len > STREAM_FLUSH_CHARS):
+                            stream_ph.markdown(streamed_answer)
+                            flushed_len, last_flush = len(streamed_answer), time.monotonic()
+                    elif event_type == "result":
+                        result = event["result"]
                 
-                # 3. Reflection Section
-                if reflection_events:
-                    with st.expander("🤔 Reflection", expanded=False):
-                        for event in reflection_events:
-                            decision = event.get("decision", "UNKNOWN")
-                            context_count = event.get("context_count", 0)
-                            
-                            if "YES" in decision:
-                                st.success(f"✅ Sufficient information ({context_count} context items)")
-                            else:
-                                st.warning(f"⚠️ Need more information ({context_count} context items)")
-                            
-                            st.caption(f"⏱️ {event.get('timestamp', 'N/A')}")
+                # The final answer is rendered with citations below
+                stream_ph.empty()
+                
+                total_ms = (time.perf_counter() - start_time) * 1000
+                if cached_result is not None:
+                    # The replayed events carry the original run's phase latencies, none of which happened now
+                    timings = Timings(total_ms=round(total_ms, 1))
+                else:
+                    timings = Timings.from_events(result.get("execution_events", []), total_ms=total_ms)
+                log_query_timings(prompt, timings, cached=cached_result is not None)
+                
+                if cached_result is None and result:
+                    get_cache().put(prompt, result, variant=cache_variant)
+                    get_store().put_result(prompt, result, variant=cache_variant)
+                    if query_embedding is not None:
+                        get_semantic_cache().put(query_embedding, prompt, result, variant=cache_variant)
+                        # One row per answer rather than re-dumping the whole cache
+                        get_store().put_query_embedding(prompt, query_embedding, variant=cache_variant)
                 
-                # 4. Answer Section
-                if answer_events:
-                    with st.expander("💡 Answer Generation", expanded=False):
-                        for event in answer_events:
-                            st.markdown(f"**Answer Length:** {event.get('answer_length', 0)} characters")
-                            st.caption(f"⏱️ {event.get('timestamp', 'N/A')}")
+                # Store result in session state so it persists across reruns
+                st.session_state.last_result = result
                 
                 # Display execution summary
                 if "execution_summary" in result:
@@ -521,6 +1071,9 @@ if prompt:
                     with col3:
                         st.metric("Total Time (s)", summary.get("execution_time_seconds", 0))
                     
+                    # Per-phase latency breakdown
+                    st.dataframe([asdict(timings)], hide_index=True, use_container_width=True)
+                    
                 status.update(label="✅ Reasoning Complete", state="complete", expanded=False)
                 
                 # Source Inspector: Side-by-Side Layout
@@ -538,27 +1091,20 @@ if prompt:
                     answer = result.get("answer", "No answer generated.")
                     
                     # Parse and make citations clickable
-                    import re
-                    citation_pattern = r'\[(\d+)\]'
-                    
-                    # Find all citations
-                    citations = re.findall(citation_pattern, answer)
+                    citations = parse_citations(answer)
                     
                     # Display answer with clickable citations
                     if citations:
-                        # Split by citations and rebuild with buttons
-                        parts = re.split(citation_pattern, answer)
-                        
                         # Display the answer with inline citation buttons
                         st.markdown(answer)
                         
                         # Display citation buttons below
                         st.caption("Click a citation number to view source:")
-                        citation_cols = st.columns(min(len(set(citations)), 10))
-                        for idx, cite_num in enumerate(sorted(set(citations), key=int)):
+                        citation_cols = st.columns(min(len(citations), 10))
+                        for idx, cite_num in enumerate(citations):
                             with citation_cols[idx % 10]:
                                 if st.button(f"[{cite_num}]", key=f"cite_{cite_num}"):
-                                    st.session_state.selected_citation = int(cite_num) - 1
+                                    st.session_state.selected_citation = cite_num - 1
                                     st.rerun()
                     else:
                         st.markdown(answer)
@@ -586,13 +1132,13 @@ if prompt:
                             
                             st.divider()
                             
-                            # Display content in a scrollable container
+                            # Display content in a scrollable, read-only container
                             st.markdown("**Content:**")
-                            st.text_area(
-                                "Source Content",
-                                doc.get('content', 'No content available'),
-                                height=300,
-                                label_visibility="collapsed"
+                            content = html.escape(doc.get('content', 'No content available')).replace("\n", "&#10;")
+                            st.markdown(
+                                '<div style="max-height: 300px; overflow-y: auto; border: 2px solid #000; '
+                                f'padding: 8px; white-space: pre-wrap;">{content}</div>',
+                                unsafe_allow_html=True
                             )
                         else:
                             st.info(f"Citation [{cite_idx + 1}] not found in sources.")
@@ -614,123 +1160,46 @@ if prompt:
                     
                     # Display as clickable buttons
                     for idx, query in enumerate(result["followup_queries"]):
-                        if st.button(f"💡 {query}", key=f"followup_{idx}"):
-                            # Store the selected query in session state
-                            st.session_state.suggested_query = query
-                            st.rerun()
+                        st.button(f"💡 {query}", key=f"followup_{idx}", on_click=queue_query, args=(query,))
                 
                 # Display Citations (Full List)
                 if "context" in result and result["context"]:
                     st.divider()
                     st.subheader("📚 All Sources")
-                    for idx, doc in enumerate(result["context"]):
-                        with st.expander(f"Source {idx+1}: {doc.get('metadata', {}).get('doc_title', 'Unknown')}"):
-                            st.caption(f"Section: {doc.get('metadata', {}).get('section_title', 'Unknown')}")
-                            st.text(doc.get('content'))
+                    st.markdown(
+                        format_sources_html(json.dumps(result["context"], sort_keys=True, default=str)),
+                        unsafe_allow_html=True
+                    )
                 
                 # RAGAS Evaluation Section (moved after All Sources)
-                if enable_ragas and "context" in result and result["context"]:
+                eval_id = None
+                # Turns without sources are submitted too: the queue scores them 0 and logs them as skipped
+                if enable_ragas and result:
                     st.divider()
                     st.subheader("🎯 RAGAS Evaluation")
-                    
-                    with st.spinner("Evaluating answer quality..."):
-                        try:
-                            # Initialize evaluator
-                            evaluator = RAGASEvaluator()
-                            
-                            # Prepare contexts (extract content from context documents)
-                            context_texts = [doc.get("content", "") for doc in result["context"]]
-                            
-                            # Evaluate
-                            eval_result = evaluator.evaluate_single(
-                                question=prompt,
-                                answer=answer,
-                                contexts=context_texts
-                            )
-                            
-                            # Display metrics
-                            if show_metrics:
-                                col1, col2 = st.columns(2)
-                                
-                                with col1:
-                                    faithfulness_score = eval_result.get('faithfulness', 0.0)
-                                    
-                                    # Color-code based on threshold
-                                    if faithfulness_score >= faithfulness_threshold:
-                                        st.success(f"**Faithfulness:** {faithfulness_score:.3f} ✅")
-                                        st.caption("Answer is well-grounded in the sources")
-                                    else:
-                                        st.error(f"**Faithfulness:** {faithfulness_score:.3f} ⚠️")
-                                        st.caption("Potential hallucination detected!")
-                                
-                                with col2:
-                                    relevancy_score = eval_result.get('answer_relevancy', 0.0)
-                                    
-                                    if relevancy_score >= 0.7:
-                                        st.success(f"**Answer Relevancy:** {relevancy_score:.3f} ✅")
-                                    elif relevancy_score >= 0.5:
-                                        st.warning(f"**Answer Relevancy:** {relevancy_score:.3f} ⚠️")
-                                    else:
-                                        st.error(f"**Answer Relevancy:** {relevancy_score:.3f} ❌")
-                                
-                                # Show detailed breakdown in expander
-                                with st.expander("📊 Detailed Evaluation Metrics"):
-                                    st.json(eval_result)
-                                    
-                                    # Interpretation guide
-                                    st.markdown("""
-                                    **Metric Interpretation:**
-                                    - **Faithfulness (0-1):** Measures if the answer is factually consistent with the context. Higher is better.
-                                    - **Answer Relevancy (0-1):** Measures how well the answer addresses the question. Higher is better.
-                                    
-                                    **Thresholds:**
-                                    - ✅ Good: ≥ 0.7
-                                    - ⚠️ Moderate: 0.5 - 0.7
-                                    - ❌ Poor: < 0.5
-                                    """)
-                            else:
-                                # Compact view
-                                faithfulness_score = eval_result.get('faithfulness', 0.0)
-                                if faithfulness_score < faithfulness_threshold:
-                                    st.warning(f"⚠️ Low faithfulness score: {faithfulness_score:.3f}")
-                                else:
-                                    st.success(f"✅ Faithfulness: {faithfulness_score:.3f}")
-                            
-                            # Log evaluation if enabled
-                            if log_evaluations:
-                                logger = EvaluationLogger()
-                                logger.log_evaluation(
-                                    question=prompt,
-                                    answer=answer,
-                                    contexts=context_texts,
-                                    metrics=eval_result,
-                                    metadata={
-                                        "num_sources": len(result["context"]),
-                                        "model": model_name
-                                    }
-                                )
-                                st.caption("📝 Evaluation logged")
-                        
-                        except Exception as e:
-                            st.error(f"Evaluation failed: {str(e)}")
-                            st.caption("The system will continue without evaluation metrics")
+                    # Scored in the background so the answer isn't held up by RAGAS' LLM calls
+                    eval_id = uuid.uuid4().hex
+                    get_eval_queue().submit(
+                        eval_id,
+                        question=prompt,
+                        answer=answer,
+                        contexts=[doc.get("content", "") for doc in result.get("context", [])],
+                        metadata={
+                            "num_sources": len(result.get("context", [])),
+                            "model": model_name
+                        },
+                        log=log_evaluations
+                    )
+                    await_evaluation(eval_id)
                 
                 
                 # Save to history
-                st.session_state.messages.append({"role": "assistant", "content": answer})
+                message = {"role": "assistant", "content": answer}
+                if eval_id:
+                    message["eval_id"] = eval_id
+                st.session_state.messages.append(message)
+                get_store().add_message(st.session_state.session_id, "assistant", answer)
                 
             except Exception as e:
                 st.error(f"Error: {str(e)}")
                 status.update(label="❌ Failed", state="error")
-
-# Handle suggested query clicks
-if "suggested_query" in st.session_state and st.session_state.suggested_query:
-    # Auto-submit the suggested query
-    suggested = st.session_state.suggested_query
-    st.session_state.suggested_query = None  # Clear it
-    
-    # Store as pending query to be processed on next run
-    st.session_state.pending_query = suggested
-    st.rerun()
-
-
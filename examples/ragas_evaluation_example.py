@@ -8,16 +8,19 @@ This script shows how to:
 4. Log evaluation results
 """
 
+import io
 import asyncio
+from functools import partial
 from src.evaluation import RAGASEvaluator, EvaluationLogger
 from src.reasoning import ReasoningAgent
 
 
-async def example_single_evaluation():
+async def example_single_evaluation(out=None):
     """Example: Evaluate a single question-answer pair"""
-    print("=" * 60)
-    print("Example 1: Single Evaluation")
-    print("=" * 60)
+    say = partial(print, file=out)
+    say("=" * 60)
+    say("Example 1: Single Evaluation")
+    say("=" * 60)
     
     evaluator = RAGASEvaluator()
     
@@ -38,32 +41,33 @@ async def example_single_evaluation():
         This quinoxaline derivative tau binder has high affinity and selectivity for tau aggregates."""
     ]
     
-    print(f"\nQuestion: {question}")
-    print(f"\nAnswer: {answer}")
-    print(f"\nNumber of contexts: {len(contexts)}")
+    say(f"\nQuestion: {question}")
+    say(f"\nAnswer: {answer}")
+    say(f"\nNumber of contexts: {len(contexts)}")
     
-    print("\nEvaluating...")
-    result = evaluator.evaluate_single(question, answer, contexts)
+    say("\nEvaluating...")
+    result = await asyncio.to_thread(evaluator.evaluate_single, question, answer, contexts)
     
-    print("\n--- Evaluation Results ---")
-    print(f"Faithfulness: {result.get('faithfulness', 0):.3f}")
-    print(f"Answer Relevancy: {result.get('answer_relevancy', 0):.3f}")
+    say("\n--- Evaluation Results ---")
+    say(f"Faithfulness: {result.get('faithfulness', 0):.3f}")
+    say(f"Answer Relevancy: {result.get('answer_relevancy', 0):.3f}")
     
     # Check for hallucination
-    is_faithful = evaluator.is_answer_faithful(question, answer, contexts, threshold=0.7)
+    is_faithful = await asyncio.to_thread(evaluator.is_answer_faithful, question, answer, contexts, threshold=0.7)
     if is_faithful:
-        print("\n✅ Answer is faithful to the context (no hallucination detected)")
+        say("\n✅ Answer is faithful to the context (no hallucination detected)")
     else:
-        print("\n⚠️ Warning: Potential hallucination detected!")
+        say("\n⚠️ Warning: Potential hallucination detected!")
     
-    print()
+    say()
 
 
-async def example_batch_evaluation():
+async def example_batch_evaluation(out=None):
     """Example: Batch evaluate multiple Q&A pairs"""
-    print("=" * 60)
-    print("Example 2: Batch Evaluation")
-    print("=" * 60)
+    say = partial(print, file=out)
+    say("=" * 60)
+    say("Example 2: Batch Evaluation")
+    say("=" * 60)
     
     evaluator = RAGASEvaluator()
     
@@ -85,26 +89,27 @@ async def example_batch_evaluation():
         ["C8 showed good blood-brain barrier (BBB) permeability in BALB/C nude mice by in vivo imaging after intravenous injection."]
     ]
     
-    print(f"\nEvaluating {len(questions)} Q&A pairs...")
-    results_df = evaluator.evaluate_batch(questions, answers, contexts)
+    say(f"\nEvaluating {len(questions)} Q&A pairs...")
+    results_df = await evaluator.aevaluate_batch(questions, answers, contexts)
     
-    print("\n--- Batch Evaluation Results ---")
-    print(results_df[['faithfulness', 'answer_relevancy']])
+    say("\n--- Batch Evaluation Results ---")
+    say(results_df[['faithfulness', 'answer_relevancy']])
     
-    print("\n--- Summary Statistics ---")
-    print(f"Average Faithfulness: {results_df['faithfulness'].mean():.3f}")
-    print(f"Average Relevancy: {results_df['answer_relevancy'].mean():.3f}")
-    print(f"Min Faithfulness: {results_df['faithfulness'].min():.3f}")
-    print(f"Max Faithfulness: {results_df['faithfulness'].max():.3f}")
+    say("\n--- Summary Statistics ---")
+    say(f"Average Faithfulness: {results_df['faithfulness'].mean():.3f}")
+    say(f"Average Relevancy: {results_df['answer_relevancy'].mean():.3f}")
+    say(f"Min Faithfulness: {results_df['faithfulness'].min():.3f}")
+    say(f"Max Faithfulness: {results_df['faithfulness'].max():.3f}")
     
-    print()
+    say()
 
 
-async def example_with_logging():
+async def example_with_logging(out=None):
     """Example: Evaluate and log results"""
-    print("=" * 60)
-    print("Example 3: Evaluation with Logging")
-    print("=" * 60)
+    say = partial(print, file=out)
+    say("=" * 60)
+    say("Example 3: Evaluation with Logging")
+    say("=" * 60)
     
     evaluator = RAGASEvaluator()
     logger = EvaluationLogger()
@@ -115,19 +120,20 @@ async def example_with_logging():
         "Purified pAAV-hSyn-hTau-mCHERRY-3×FLAG virus was injected bilaterally into the hippocampus CA1 region of male C57BL/6 mice (8 weeks old) to induce hTau-overexpressed mouse model."
     ]
     
-    print(f"\nQuestion: {question}")
-    print(f"\nAnswer: {answer}")
+    say(f"\nQuestion: {question}")
+    say(f"\nAnswer: {answer}")
     
-    print("\nEvaluating...")
-    result = evaluator.evaluate_single(question, answer, contexts)
+    say("\nEvaluating...")
+    result = await asyncio.to_thread(evaluator.evaluate_single, question, answer, contexts)
     
-    print("\n--- Evaluation Results ---")
-    print(f"Faithfulness: {result.get('faithfulness', 0):.3f}")
-    print(f"Answer Relevancy: {result.get('answer_relevancy', 0):.3f}")
+    say("\n--- Evaluation Results ---")
+    say(f"Faithfulness: {result.get('faithfulness', 0):.3f}")
+    say(f"Answer Relevancy: {result.get('answer_relevancy', 0):.3f}")
     
     # Log the evaluation
-    print("\nLogging evaluation...")
-    logger.log_evaluation(
+    say("\nLogging evaluation...")
+    await asyncio.to_thread(
+        logger.log_evaluation,
         question=question,
         answer=answer,
         contexts=contexts,
@@ -138,18 +144,18 @@ async def example_with_logging():
         }
     )
     
-    print("✅ Evaluation logged to data/evaluation_logs.csv")
+    say("✅ Evaluation logged to data/evaluation_logs.csv")
     
     # Show evaluation history
     history = logger.get_evaluation_history()
     if not history.empty:
-        print(f"\nTotal evaluations in history: {len(history)}")
+        say(f"\nTotal evaluations in history: {len(history)}")
         avg_metrics = logger.get_average_metrics()
-        print("\nAverage metrics across all evaluations:")
+        say("\nAverage metrics across all evaluations:")
         for metric, value in avg_metrics.items():
-            print(f"  {metric}: {value:.3f}")
+            say(f"  {metric}: {value:.3f}")
     
-    print()
+    say()
 
 
 async def example_with_real_agent():
@@ -166,7 +172,10 @@ async def example_with_real_agent():
     print(f"\nQuestion: {question}")
     print("\nRunning agent...")
     
-    result = await agent.run(question)
+    try:
+        result = await agent.run(question)
+    finally:
+        await agent.aclose()
     
     answer = result.get("answer", "")
     context_docs = result.get("context", [])
@@ -202,10 +211,18 @@ async def main():
     print("RAGAS Evaluation Examples for MedGraph-RAG")
     print("=" * 60 + "\n")
     
-    # Run examples
-    await example_single_evaluation()
-    await example_batch_evaluation()
-    await example_with_logging()
+    # The examples are independent, so their RAGAS calls run concurrently;
+    # each writes to its own buffer, printed in order once all have finished
+    examples = [example_single_evaluation, example_batch_evaluation, example_with_logging]
+    buffers = [io.StringIO() for _ in examples]
+    results = await asyncio.gather(
+        *[example(out=buffer) for example, buffer in zip(examples, buffers)],
+        return_exceptions=True
+    )
+    for example, buffer, result in zip(examples, buffers, results):
+        print(buffer.getvalue(), end="")
+        if isinstance(result, Exception):
+            print(f"❌ {example.__name__} failed: {result}\n")
     
     # Uncomment to test with real agent (requires Neo4j connection)
     # await example_with_real_agent()
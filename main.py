@@ -2,87 +2,152 @@ import os
 import glob
 import asyncio
 import argparse
+import itertools
 from pathlib import Path
 from src.graph import Neo4jManager
 from src.ingestion import MarkdownLoader
 from src.extraction import RelationExtractor
 from src.reasoning import ReasoningAgent
 from src.llm import get_embeddings
+from src.executor import run_blocking
+from src.cache import EmbeddingCache
 
-async def ingest_data(data_dir: Path):
+# Paths pulled from the directory walk per trip to the blocking pool
+WALK_BATCH_SIZE = 64
+
+async def _ingest_triplets(
+    document,
+    doc_dict: dict,
+    manager: Neo4jManager,
+    extractor: RelationExtractor,
+    write_lock: asyncio.Lock
+):
+    """
+    Extracts triplets from a document and loads them into the graph.
+    Extraction runs concurrently across files; the Entity MERGEs go through `write_lock` one
+    file at a time, so concurrent transactions never race to create the same entity.
+    """
+    print(f"   Extracting triplets from {len(document.sections)} sections...")
+    triplets = await extractor.process_document(doc_dict)
+    print(f"   Found {len(triplets)} triplets in {document.title}.")
+    
+    if triplets:
+        async with write_lock:
+            await run_blocking(manager.add_triplets, triplets)
+        print(f"   ✅ Ingested {len(triplets)} triplets into graph.")
+
+async def _ingest_chunks(document, manager: Neo4jManager, embeddings, embed_cache: EmbeddingCache):
+    """Creates the embedded Chunk nodes for a document's sections."""
+    embedded_sections = [s for s in document.sections if s.content and len(s.content) > 50]
+    texts = [section.content for section in embedded_sections]
+    
+    # Unchanged sections reuse their vectors from earlier runs; the rest go out in one
+    # batched request, whose retrieval_query task type matches the former embed_query calls
+    cached = await run_blocking(embed_cache.get_many, texts)
+    misses = list(dict.fromkeys(text for text in texts if text not in cached))
+    if misses:
+        new_vectors = await run_blocking(embeddings.embed_documents, misses, task_type="retrieval_query")
+        await run_blocking(embed_cache.put_many, misses, new_vectors)
+        cached.update(zip(misses, new_vectors))
+    vectors = [cached[text] for text in texts]
+    if texts:
+        print(f"   Embedded {len(misses)} sections ({len(texts) - len(misses)} from cache).")
+    
+    # Chunks attach to the sections written with the document
+    await run_blocking(manager.add_chunks, [
+        {
+            "id": f"chunk_{section.id}", # distinct ID from section (1-to-1 for now)
+            "content": section.content,
+            "embedding": vector,
+            "section_id": section.id
+        }
+        for section, vector in zip(embedded_sections, vectors)
+    ])
+    print(f"   ✅ Created {len(embedded_sections)} chunks with embeddings for {document.title}.")
+
+async def _process_file(
+    file_path: Path,
+    manager: Neo4jManager,
+    extractor: RelationExtractor,
+    embeddings,
+    embed_cache: EmbeddingCache,
+    sem: asyncio.Semaphore,
+    write_lock: asyncio.Lock
+):
+    """Parses one markdown file and ingests its document, triplets and chunks, then frees its slot in `sem`."""
+    try:
+        print(f"Processing: {file_path.name}")
+        
+        # 1. Parse Markdown
+        document = await run_blocking(MarkdownLoader(file_path).parse)
+        
+        # 2. Ingest the Document and its Sections into Neo4j in one transaction
+        # (chunks and triplets attach to them, so this goes first)
+        doc_dict = document.model_dump()
+        await run_blocking(manager.add_document, doc_dict, sections=doc_dict["sections"])
+        print(f"✅ Ingested Document: {document.title}")
+        
+        # 3-5. Triplet extraction (Phase 2) and chunk embedding (Phase 3) are independent
+        await asyncio.gather(
+            _ingest_triplets(document, doc_dict, manager, extractor, write_lock),
+            _ingest_chunks(document, manager, embeddings, embed_cache)
+        )
+        
+    except Exception as e:
+        print(f"❌ Failed to process {file_path.name}: {e}")
+    finally:
+        sem.release()
+
+async def ingest_data(data_dir: Path, concurrency: int = 8):
     """
     Iterates over all .md files in the data directory, parses them,
     and ingests them into the Neo4j graph with embeddings.
+    Up to `concurrency` files are processed at once; their LLM and embedding
+    calls overlap, and blocking Neo4j writes run on the shared thread pool.
     """
     manager = Neo4jManager()
     extractor = RelationExtractor()
     embeddings = get_embeddings()
+    # Section embeddings by content hash, so re-ingests only embed changed sections
+    embed_cache = EmbeddingCache("data/.embed_cache.db", model=getattr(embeddings, "model", ""))
     
     try:
-        # Find all markdown files
-        md_files = list(data_dir.glob("**/*.md"))
+        print(f"Starting ingestion from {data_dir} ({concurrency} files at a time)...")
+        # Entity MERGEs in add_triplets seek on this index
+        manager.create_entity_name_index()
+
+        # The directory walk feeds files in as slots free up, so processing starts with
+        # the first file found and at most `concurrency` files are in flight
+        sem = asyncio.Semaphore(concurrency)
+        write_lock = asyncio.Lock()
+        tasks = set()
+        file_count = 0
+        # rglob blocks on directory I/O, so the walk is advanced on the blocking pool a slice at a time
+        walker = data_dir.rglob("*.md")
+        while file_paths := await run_blocking(list, itertools.islice(walker, WALK_BATCH_SIZE)):
+            for file_path in file_paths:
+                await sem.acquire()
+                task = asyncio.create_task(_process_file(file_path, manager, extractor, embeddings, embed_cache, sem, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                file_count += 1
+        await asyncio.gather(*tasks, return_exceptions=True)
         
-        if not md_files:
+        if not file_count:
             print(f"No markdown files found in {data_dir}")
             return
-
-        print(f"Found {len(md_files)} markdown files. Starting ingestion...")
-
-        for file_path in md_files:
-            try:
-                print(f"Processing: {file_path.name}")
-                
-                # 1. Parse Markdown
-                loader = MarkdownLoader(file_path)
-                document = loader.parse()
-                
-                # 2. Ingest into Neo4j
-                doc_dict = document.model_dump()
-                manager.add_document(doc_dict)
-                print(f"✅ Ingested Document: {document.title}")
-
-                # 3. Extract Triplets (Phase 2)
-                print(f"   Extracting triplets from {len(document.sections)} sections...")
-                triplets = await extractor.process_document(doc_dict)
-                print(f"   Found {len(triplets)} triplets.")
-                
-                # 4. Ingest Triplets
-                if triplets:
-                    manager.add_triplets(triplets)
-                    print(f"   ✅ Ingested {len(triplets)} triplets into graph.")
-                
-                # 5. Create Chunks with Embeddings (Phase 3)
-                print(f"   Creating chunks with embeddings...")
-                for section in document.sections:
-                    # Create Section Node
-                    manager.add_section(section.model_dump())
-                    
-                    if section.content and len(section.content) > 50:
-                        # Create embedding
-                        embedding = embeddings.embed_query(section.content)
-                        
-                        # Create Chunk Node (1-to-1 with Section for now)
-                        chunk_data = {
-                            "id": f"chunk_{section.id}", # distinct ID from section
-                            "content": section.content,
-                            "embedding": embedding,
-                            "section_id": section.id
-                        }
-                        manager.add_chunk(chunk_data)
-                print(f"   ✅ Created sections and chunks with embeddings.")
-                
-            except Exception as e:
-                print(f"❌ Failed to process {file_path.name}: {e}")
-                await asyncio.sleep(0.1)
+        print(f"Processed {file_count} markdown files.")
 
         # 6. Create Indexes
         print("\n>>> Creating Vector Index...")
         manager.create_vector_index(dimension=768)
+        manager.create_entity_fulltext_index()
         
         print("\n>>> Running Community Detection...")
         manager.create_community_index()
 
     finally:
+        embed_cache.close()
         manager.close()
 
 async def query_mode():
@@ -97,6 +162,13 @@ async def query_mode():
     
     agent = ReasoningAgent()
     
+    try:
+        await _query_loop(agent)
+    finally:
+        await agent.aclose()
+
+async def _query_loop(agent: ReasoningAgent):
+    """Reads questions from stdin and prints the agent's trace and answer until the user quits."""
     while True:
         try:
             query = input("\n🔍 Your Question: ").strip()
@@ -136,6 +208,8 @@ async def main():
                        help="Mode: 'ingest' to load data, 'query' to ask questions")
     parser.add_argument("--data-dir", type=str, default="data/markdowns",
                        help="Directory containing markdown files (for ingest mode)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                       help="Markdown files processed at once (for ingest mode)")
     
     args = parser.parse_args()
     
@@ -148,7 +222,7 @@ async def main():
             print("Checking 'data' root...")
             data_dir = base_dir / "data"
         
-        await ingest_data(data_dir)
+        await ingest_data(data_dir, concurrency=args.concurrency)
     else:
         await query_mode()
 
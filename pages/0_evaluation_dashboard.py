@@ -7,11 +7,10 @@ in answer quality, faithfulness, and relevancy.
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from src.evaluation import EvaluationLogger
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Page Config
 st.set_page_config(
@@ -41,11 +40,108 @@ st.markdown("""
 st.title("📊 RAGAS Evaluation Dashboard")
 st.caption("Monitor and analyze RAG system performance over time")
 
-# Initialize logger
-logger = EvaluationLogger()
+@st.cache_resource
+def get_eval_logger():
+    """One read-side logger per process, shared by every dashboard session."""
+    return EvaluationLogger()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_history() -> pd.DataFrame:
+    """Reads the evaluation log (timestamps already parsed); cached so widget reruns skip the disk read."""
+    df = get_eval_logger().get_evaluation_history()
+    # Narrower dtypes halve the frame and the JSON Plotly serializes from it
+    for column in ('faithfulness', 'answer_relevancy'):
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float32')
+    if 'num_contexts' in df.columns:
+        df['num_contexts'] = pd.to_numeric(df['num_contexts'], downcast='integer')
+    if 'model' in df.columns:
+        df['model'] = df['model'].astype('category')
+    return df
+
+@st.cache_data(ttl=60, show_spinner=False)
+def filter_history(start_date, end_date, min_faithfulness: float, min_relevancy: float) -> pd.DataFrame:
+    """Applies the sidebar filters to the cached history; cached per filter combination."""
+    df = load_history()
+    mask = pd.Series(True, index=df.index)
+    if 'timestamp' in df.columns and start_date is not None:
+        dates = df['timestamp'].dt.date
+        mask &= (dates >= start_date) & (dates <= end_date)
+    if 'faithfulness' in df.columns:
+        mask &= df['faithfulness'] >= min_faithfulness
+    if 'answer_relevancy' in df.columns:
+        mask &= df['answer_relevancy'] >= min_relevancy
+    return df[mask]
+
+@st.cache_data(ttl=60, show_spinner=False)
+def sort_history(df: pd.DataFrame, sort_by: str, ascending: bool) -> pd.DataFrame:
+    return df.sort_values(sort_by, ascending=ascending)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def describe_history(df: pd.DataFrame) -> pd.DataFrame:
+    numeric_cols = df.select_dtypes(include=['number']).columns
+    return df[numeric_cols].describe() if len(numeric_cols) > 0 else pd.DataFrame()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    """Encoded CSV for the download button, built once per filtered frame rather than every rerun."""
+    return df.to_csv(index=False).encode('utf-8')
+
+HALLUCINATION_THRESHOLD = 0.7
+HISTOGRAM_BINS = 20
+
+@st.cache_data(ttl=60, show_spinner=False)
+def metric_summary(df: pd.DataFrame) -> dict:
+    """
+    Mean/median/std and a 20-bin histogram per metric column (plus the hallucination
+    rate for faithfulness) and their correlation, computed once per filtered frame on
+    plain float32 arrays.
+    """
+    summary = {}
+    arrays = {}
+    for column in ('faithfulness', 'answer_relevancy'):
+        if column not in df.columns:
+            continue
+        values = df[column].to_numpy(dtype=np.float32, na_value=np.nan)
+        arrays[column] = values
+        present = values[~np.isnan(values)]
+        counts, edges = np.histogram(present, bins=HISTOGRAM_BINS, range=(0.0, 1.0))
+        stats = {
+            "mean": float(present.mean()) if present.size else float("nan"),
+            "median": float(np.median(present)) if present.size else float("nan"),
+            "std": float(present.std(ddof=1)) if present.size > 1 else float("nan"),
+            "histogram": (counts.tolist(), edges.tolist()),
+        }
+        if column == 'faithfulness':
+            stats["hallucination_rate"] = float((values < HALLUCINATION_THRESHOLD).mean() * 100) if values.size else float("nan")
+        summary[column] = stats
+    
+    if len(arrays) == 2:
+        # Pairwise-complete rows, as pandas' Series.corr does
+        faithfulness, relevancy = arrays['faithfulness'], arrays['answer_relevancy']
+        both = ~np.isnan(faithfulness) & ~np.isnan(relevancy)
+        summary["correlation"] = (
+            float(np.corrcoef(faithfulness[both], relevancy[both])[0, 1]) if both.sum() > 1 else float("nan")
+        )
+    return summary
+
+def histogram_figure(histogram, color: str, xaxis_title: str) -> "go.Figure":
+    """Bar chart of precomputed bins, so Plotly receives HISTOGRAM_BINS bars rather than every row."""
+    import plotly.graph_objects as go
+
+    counts, edges = histogram
+    centers = [(lo + hi) / 2 for lo, hi in zip(edges, edges[1:])]
+    fig = go.Figure(go.Bar(x=centers, y=counts, width=edges[1] - edges[0], marker_color=color))
+    fig.update_layout(
+        xaxis_title=xaxis_title,
+        yaxis_title="Count",
+        showlegend=False,
+        template='plotly_white'
+    )
+    return fig
 
 # Load evaluation history
-df = logger.get_evaluation_history()
+df = load_history()
 
 if df.empty:
     st.info("No evaluation data available yet. Enable RAGAS evaluation in the main app to start collecting metrics.")
@@ -56,8 +152,8 @@ with st.sidebar:
     st.header("Filters")
     
     # Date range filter
+    start_date = end_date = None
     if 'timestamp' in df.columns:
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
         min_date = df['timestamp'].min().date()
         max_date = df['timestamp'].max().date()
         
@@ -70,8 +166,6 @@ with st.sidebar:
         
         if len(date_range) == 2:
             start_date, end_date = date_range
-            df = df[(df['timestamp'].dt.date >= start_date) & 
-                   (df['timestamp'].dt.date <= end_date)]
     
     # Metric threshold filter
     st.subheader("Metric Filters")
@@ -79,10 +173,7 @@ with st.sidebar:
     min_relevancy = st.slider("Min Answer Relevancy", 0.0, 1.0, 0.0, 0.05)
     
     # Apply filters
-    if 'faithfulness' in df.columns:
-        df = df[df['faithfulness'] >= min_faithfulness]
-    if 'answer_relevancy' in df.columns:
-        df = df[df['answer_relevancy'] >= min_relevancy]
+    df = filter_history(start_date, end_date, min_faithfulness, min_relevancy)
     
     st.divider()
     st.caption(f"Showing {len(df)} evaluations")
@@ -90,6 +181,8 @@ with st.sidebar:
 # Main Dashboard
 tab1, tab2, tab3, tab4 = st.tabs(["📈 Overview", "📊 Metrics Analysis", "🔍 Query Explorer", "📋 Raw Data"])
 
+summary = metric_summary(df)
+
 with tab1:
     st.header("Overview")
     
@@ -104,29 +197,26 @@ with tab1:
         )
     
     with col2:
-        if 'faithfulness' in df.columns:
-            avg_faithfulness = df['faithfulness'].mean()
+        if 'faithfulness' in summary:
             st.metric(
                 "Avg Faithfulness",
-                f"{avg_faithfulness:.3f}",
+                f"{summary['faithfulness']['mean']:.3f}",
                 help="Average faithfulness score across all queries"
             )
     
     with col3:
-        if 'answer_relevancy' in df.columns:
-            avg_relevancy = df['answer_relevancy'].mean()
+        if 'answer_relevancy' in summary:
             st.metric(
                 "Avg Relevancy",
-                f"{avg_relevancy:.3f}",
+                f"{summary['answer_relevancy']['mean']:.3f}",
                 help="Average answer relevancy score"
             )
     
     with col4:
-        if 'faithfulness' in df.columns:
-            hallucination_rate = (df['faithfulness'] < 0.7).sum() / len(df) * 100
+        if 'faithfulness' in summary:
             st.metric(
                 "Hallucination Rate",
-                f"{hallucination_rate:.1f}%",
+                f"{summary['faithfulness']['hallucination_rate']:.1f}%",
                 help="Percentage of answers with faithfulness < 0.7"
             )
     
@@ -137,8 +227,11 @@ with tab1:
         st.subheader("Metrics Over Time")
         
         # Prepare data for plotting
-        df_sorted = df.sort_values('timestamp')
+        df_sorted = sort_history(df, 'timestamp', ascending=True)
         
+        # Plotly is imported where a chart is drawn: st.tabs renders every tab body,
+        # so this only pays off when there is nothing to plot, but it keeps an empty log cheap
+        import plotly.graph_objects as go
         fig = go.Figure()
         
         if 'faithfulness' in df.columns:
@@ -162,8 +255,8 @@ with tab1:
             ))
         
         # Add threshold line
-        fig.add_hline(y=0.7, line_dash="dash", line_color="gray",
-                     annotation_text="Threshold (0.7)")
+        fig.add_hline(y=HALLUCINATION_THRESHOLD, line_dash="dash", line_color="gray",
+                     annotation_text=f"Threshold ({HALLUCINATION_THRESHOLD})")
         
         fig.update_layout(
             title="Evaluation Metrics Timeline",
@@ -186,56 +279,39 @@ with tab2:
         if 'faithfulness' in df.columns:
             st.subheader("Faithfulness Distribution")
             
-            fig = px.histogram(
-                df,
-                x='faithfulness',
-                nbins=20,
-                color_discrete_sequence=['#4ECDC4']
-            )
-            fig.update_layout(
-                xaxis_title="Faithfulness Score",
-                yaxis_title="Count",
-                showlegend=False,
-                template='plotly_white'
-            )
+            stats = summary['faithfulness']
+            fig = histogram_figure(stats['histogram'], '#4ECDC4', "Faithfulness Score")
             st.plotly_chart(fig, use_container_width=True)
             
             # Statistics
-            st.caption(f"Mean: {df['faithfulness'].mean():.3f} | "
-                      f"Median: {df['faithfulness'].median():.3f} | "
-                      f"Std: {df['faithfulness'].std():.3f}")
+            st.caption(f"Mean: {stats['mean']:.3f} | "
+                      f"Median: {stats['median']:.3f} | "
+                      f"Std: {stats['std']:.3f}")
     
     with col2:
         # Answer relevancy distribution
         if 'answer_relevancy' in df.columns:
             st.subheader("Answer Relevancy Distribution")
             
-            fig = px.histogram(
-                df,
-                x='answer_relevancy',
-                nbins=20,
-                color_discrete_sequence=['#FF6B6B']
-            )
-            fig.update_layout(
-                xaxis_title="Answer Relevancy Score",
-                yaxis_title="Count",
-                showlegend=False,
-                template='plotly_white'
-            )
+            stats = summary['answer_relevancy']
+            fig = histogram_figure(stats['histogram'], '#FF6B6B', "Answer Relevancy Score")
             st.plotly_chart(fig, use_container_width=True)
             
             # Statistics
-            st.caption(f"Mean: {df['answer_relevancy'].mean():.3f} | "
-                      f"Median: {df['answer_relevancy'].median():.3f} | "
-                      f"Std: {df['answer_relevancy'].std():.3f}")
+            st.caption(f"Mean: {stats['mean']:.3f} | "
+                      f"Median: {stats['median']:.3f} | "
+                      f"Std: {stats['std']:.3f}")
     
     # Correlation analysis
     if 'faithfulness' in df.columns and 'answer_relevancy' in df.columns:
         st.divider()
         st.subheader("Metric Correlation")
         
+        # Only the plotted and hovered columns are handed to Plotly
+        scatter_columns = [c for c in ('faithfulness', 'answer_relevancy', 'num_contexts', 'question') if c in df.columns]
+        import plotly.express as px
         fig = px.scatter(
-            df,
+            df[scatter_columns],
             x='faithfulness',
             y='answer_relevancy',
             color='num_contexts' if 'num_contexts' in df.columns else None,
@@ -250,8 +326,7 @@ with tab2:
         )
         st.plotly_chart(fig, use_container_width=True)
         
-        correlation = df['faithfulness'].corr(df['answer_relevancy'])
-        st.caption(f"Correlation coefficient: {correlation:.3f}")
+        st.caption(f"Correlation coefficient: {summary['correlation']:.3f}")
 
 with tab3:
     st.header("Query Explorer")
@@ -264,10 +339,7 @@ with tab3:
     )
     sort_order = st.radio("Order", ["Descending", "Ascending"], horizontal=True)
     
-    df_sorted = df.sort_values(
-        sort_by,
-        ascending=(sort_order == "Ascending")
-    )
+    df_sorted = sort_history(df, sort_by, ascending=(sort_order == "Ascending"))
     
     # Display queries
     for idx, row in df_sorted.iterrows():
@@ -306,10 +378,9 @@ with tab4:
     )
     
     # Download button
-    csv = df.to_csv(index=False)
     st.download_button(
         label="📥 Download CSV",
-        data=csv,
+        data=csv_bytes(df),
         file_name=f"ragas_evaluation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
         mime="text/csv"
     )
@@ -318,9 +389,9 @@ with tab4:
     st.divider()
     st.subheader("Summary Statistics")
     
-    numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
-    if len(numeric_cols) > 0:
+    describe_df = describe_history(df)
+    if not describe_df.empty:
         st.dataframe(
-            df[numeric_cols].describe(),
+            describe_df,
             use_container_width=True
         )
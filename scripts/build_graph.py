@@ -9,25 +9,60 @@ from dotenv import load_dotenv
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.extraction import RelationExtractor
-from src.graph import Neo4jManager
+from src.graph import Neo4jManager, TRIPLET_BATCH_SIZE
+from src.executor import run_blocking
 
 load_dotenv()
 
+async def process_document(doc, extractor, neo4j, args, sem: asyncio.Semaphore, write_lock: asyncio.Lock):
+    """Extracts one document's triplets while holding a `sem` slot; Neo4j writes go through `write_lock` one at a time."""
+    async with sem:
+        name = Path(doc['source_path']).name
+        print(f"\nProcessing Document: {doc['title']} ({name})")
+        
+        # 1. Extract Triplets (Document nodes were created up front)
+        print(f"  Extracting relations from {name} (this may take a moment)...")
+        triplets = await extractor.process_document(doc)
+        print(f"  Found {len(triplets)} triplets in {name}.")
+        
+        if triplets:
+            if args.dry_run:
+                print(f"  [Dry Run] Sample Triplets from {name}:")
+                for t in triplets[:3]:
+                    print(f"   - {t['head']} -> [{t['relation']}] -> {t['tail']}")
+            else:
+                # 2. Load Triplets
+                try:
+                    async with write_lock:
+                        await run_blocking(neo4j.add_triplets, triplets, batch_size=args.batch_size)
+                    print(f"  ✓ Loaded {len(triplets)} relations from {name} into Neo4j.")
+                except Exception as e:
+                    print(f"  ✗ Failed to load triplets from {name}: {e}")
+
 async def main():
     parser = argparse.ArgumentParser(description="Build Knowledge Graph from Staged Data")
     parser.add_argument("--dry-run", action="store_true", help="Run extraction but do not write to Neo4j")
     parser.add_argument("--files", nargs="+", help="Specific filenames to process (e.g. 2.md 3.md)")
+    parser.add_argument("--batch-size", type=int, default=TRIPLET_BATCH_SIZE,
+                        help=f"Triplets written per Neo4j transaction (default: {TRIPLET_BATCH_SIZE})")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Documents extracted at once (default: 4)")
     args = parser.parse_args()
 
     # Load Staged Data
-    staging_file = Path("data/staging/structured_documents.json")
-    if not staging_file.exists():
+    staging_file = Path("data/staging/structured_documents.jsonl")
+    legacy_file = Path("data/staging/structured_documents.json")
+    if staging_file.exists():
+        with open(staging_file, "r", encoding="utf-8") as f:
+            documents = [json.loads(line) for line in f if line.strip()]
+    elif legacy_file.exists():
+        # Staged before stage_data.py switched to one document per line
+        with open(legacy_file, "r", encoding="utf-8") as f:
+            documents = json.load(f)
+    else:
         print("Staged data not found. Please run scripts/stage_data.py first.")
         return
 
-    with open(staging_file, "r", encoding="utf-8") as f:
-        documents = json.load(f)
-
     # Filter documents if requested
     if args.files:
         target_files = [f if f.lower().endswith(".md") else f"{f}.md" for f in args.files]
@@ -50,37 +85,24 @@ async def main():
         try:
             neo4j = Neo4jManager()
             print("Connected to Neo4j.")
+            neo4j.create_entity_name_index()
         except Exception as e:
             print(f"Failed to connect to Neo4j: {e}")
             print("Proceeding in DRY RUN mode.")
             args.dry_run = True
 
-    # Process Loop
-    for doc in documents:
-        print(f"\nProcessing Document: {doc['title']} ({Path(doc['source_path']).name})")
-        
-        # 1. Add Document Node
-        if not args.dry_run:
-            neo4j.add_document(doc)
-            print("  ✓ Document node created.")
+    # Create every Document node in one round trip before extraction starts
+    if not args.dry_run:
+        neo4j.add_documents(documents)
+        print(f"✓ {len(documents)} document nodes created.")
 
-        # 2. Extract Triplets
-        print("  Extracting relations (this may take a moment)...")
-        triplets = await extractor.process_document(doc)
-        print(f"  Found {len(triplets)} triplets.")
-        
-        if triplets:
-            if args.dry_run:
-                print("  [Dry Run] Sample Triplets:")
-                for t in triplets[:3]:
-                    print(f"   - {t['head']} -> [{t['relation']}] -> {t['tail']}")
-            else:
-                # 3. Load Triplets
-                try:
-                    neo4j.add_triplets(triplets)
-                    print(f"  ✓ Loaded {len(triplets)} relations into Neo4j.")
-                except Exception as e:
-                    print(f"  ✗ Failed to load triplets: {e}")
+    # Process Loop: LLM extractions overlap, while a single writer at a time talks to Neo4j
+    sem = asyncio.Semaphore(args.concurrency)
+    write_lock = asyncio.Lock()
+    await asyncio.gather(*[
+        process_document(doc, extractor, neo4j, args, sem, write_lock)
+        for doc in documents
+    ])
 
     if neo4j:
         neo4j.close()
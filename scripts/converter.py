@@ -1,11 +1,59 @@
+import os
 import argparse
 import json
+import shutil
+import tempfile
+import hashlib
+import threading
+from importlib.metadata import version
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Optional
 from datetime import datetime
 from docling.document_converter import DocumentConverter
 
+# DocumentConverter is not documented as thread-safe, so each worker thread builds its own.
+# Every instance loads its own layout/OCR models: peak memory grows with the worker count.
+DEFAULT_WORKERS = 2
+_local = threading.local()
 
-def convert_pdf_to_markdown(source: str, output_dir: Path, converter: DocumentConverter) -> dict:
+
+def _thread_converter() -> DocumentConverter:
+    if not hasattr(_local, "converter"):
+        _local.converter = DocumentConverter()
+    return _local.converter
+
+
+def _convert_in_worker(source: str, output_dir: Path, cache_dir: Optional[Path]) -> dict:
+    return convert_pdf_to_markdown(source, output_dir, _thread_converter(), cache_dir)
+
+
+def _fingerprint(path: Path) -> str:
+    """Hash of the PDF bytes plus the Docling version, so upgrading Docling invalidates old entries."""
+    with open(path, "rb") as f:
+        digest = hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16))
+    digest.update(version("docling").encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, text: str):
+    """Writes via a temp file in the same directory and os.replace, so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def convert_pdf_to_markdown(
+    source: str,
+    output_dir: Path,
+    converter: DocumentConverter,
+    cache_dir: Optional[Path] = None
+) -> dict:
     """
     Convert a single PDF to markdown and save it.
     
@@ -13,16 +61,12 @@ def convert_pdf_to_markdown(source: str, output_dir: Path, converter: DocumentCo
         source: URL or local path to PDF file
         output_dir: Directory to save markdown files
         converter: DocumentConverter instance
+        cache_dir: Directory of previous conversions keyed by content hash (local files only)
         
     Returns:
         dict: Metadata about the conversion
     """
     try:
-        print(f"Converting: {source}")
-        result = converter.convert(source)
-        doc = result.document
-        markdown_content = doc.export_to_markdown()
-        
         # Generate output filename
         if source.startswith("http"):
             # Extract filename from URL
@@ -33,10 +77,38 @@ def convert_pdf_to_markdown(source: str, output_dir: Path, converter: DocumentCo
         
         output_path = output_dir / filename
         
+        # Unchanged local PDFs are copied from the cache instead of being re-parsed
+        cached_path = None
+        if cache_dir is not None and not source.startswith("http"):
+            cached_path = cache_dir / f"{_fingerprint(Path(source))}.md"
+            # The meta file is written last, so its presence marks a complete entry
+            if cached_path.with_suffix(".meta.json").exists() and cached_path.exists():
+                shutil.copyfile(cached_path, output_path)
+                print(f"✓ Cached: {output_path}")
+                return {
+                    "source": source,
+                    "output_file": str(output_path),
+                    "timestamp": datetime.now().isoformat(),
+                    "status": "success",
+                    "cached": True
+                }
+        
+        print(f"Converting: {source}")
+        result = converter.convert(source)
+        doc = result.document
+        markdown_content = doc.export_to_markdown()
+        
         # Save markdown file
         output_path.write_text(markdown_content, encoding="utf-8")
         print(f"✓ Saved: {output_path}")
         
+        if cached_path is not None:
+            _write_atomic(cached_path, markdown_content)
+            _write_atomic(
+                cached_path.with_suffix(".meta.json"),
+                json.dumps({"source": source, "timestamp": datetime.now().isoformat()})
+            )
+        
         return {
             "source": source,
             "output_file": str(output_path),
@@ -73,6 +145,25 @@ def main():
         default=Path("data/markdowns/converted.json"),
         help="JSON file to log conversion results (default: data/markdowns/converted.json)"
     )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of PDFs converted in parallel (default: {DEFAULT_WORKERS}). "
+             "Each worker loads its own copy of Docling's models, so memory grows with this"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=Path("data/.convert_cache"),
+        help="Where converted markdown is cached by PDF content hash (default: data/.convert_cache). "
+             "Kept outside the output directory so ingestion does not pick it up"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-convert every PDF even if an identical one was converted before"
+    )
     
     args = parser.parse_args()
     
@@ -94,14 +185,20 @@ def main():
             print("Usage: python converter.py <PDF_URL_or_PATH> [<PDF_URL_or_PATH> ...]")
             return
     
-    # Initialize converter
-    converter = DocumentConverter()
+    cache_dir = None
+    if not args.no_cache:
+        cache_dir = args.cache_dir
+        cache_dir.mkdir(parents=True, exist_ok=True)
     
-    # Convert all sources
+    # Convert all sources, one task per PDF
     results = []
-    for source in sources:
-        result = convert_pdf_to_markdown(source, args.output_dir, converter)
-        results.append(result)
+    workers = max(1, min(args.workers, len(sources)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_convert_in_worker, source, args.output_dir, cache_dir) for source in sources]
+        for future in as_completed(futures):
+            results.append(future.result())
+    # Completion order varies between runs; keep the log stable
+    results.sort(key=lambda r: r["source"])
     
     # Save conversion log
     args.log_file.parent.mkdir(parents=True, exist_ok=True)
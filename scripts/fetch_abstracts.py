@@ -1,11 +1,13 @@
+import io
 import os
 import time
 import json
+import asyncio
 import logging
 from datetime import datetime
 from typing import List, Dict, Optional
 from pathlib import Path
-import requests
+import aiohttp
 from Bio import Entrez
 
 # ==================== CONFIGURATION ====================
@@ -24,23 +26,100 @@ SEARCH_QUERY = "Alzheimer's disease therapeutic pathways"
 MAX_RESULTS = 100  # Start small for testing
 SAVE_DIR = Path("data/abstracts")
 METADATA_FILE = SAVE_DIR / "metadata.json"
+METADATA_LOG = SAVE_DIR / "metadata.jsonl"  # per-PMID outcomes, compacted into METADATA_FILE at exit
 SAVE_DIR.mkdir(parents=True, exist_ok=True)
 
-# Rate limiting
-REQUEST_DELAY = 0.34 if Entrez.api_key else 0.5
+# Rate limiting: NCBI allows 10 requests/s with an API key, 3/s without
+REQUEST_DELAY = 0.1 if Entrez.api_key else 0.34
+MAX_CONCURRENCY = 10
+EUTILS_BATCH_SIZE = 200  # PMIDs per efetch/elink call
+DOWNLOAD_CHUNK_BYTES = 1 << 20
+EUTILS_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
 
 # ==================== METADATA TRACKING ====================
 def load_metadata() -> Dict:
-    """Load existing download metadata."""
+    """Load existing download metadata, including outcomes logged by a run that did not finish."""
+    metadata = {"downloaded": [], "failed": [], "no_pmc": [], "total_requests": 0}
     if METADATA_FILE.exists():
         with open(METADATA_FILE, 'r') as f:
-            return json.load(f)
-    return {"downloaded": [], "failed": [], "no_pmc": [], "total_requests": 0}
+            metadata = json.load(f)
+    if METADATA_LOG.exists():
+        with open(METADATA_LOG, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    apply_outcome(metadata, json.loads(line))
+    return metadata
 
 def save_metadata(metadata: Dict):
-    """Persist download tracking."""
+    """Persist download tracking; the outcome log is folded in, so it is removed."""
     with open(METADATA_FILE, 'w') as f:
         json.dump(metadata, f, indent=2)
+    METADATA_LOG.unlink(missing_ok=True)
+
+def apply_outcome(metadata: Dict, outcome: Dict):
+    """Folds one {"status", "entry"} outcome into the metadata dict."""
+    metadata[outcome["status"]].append(outcome["entry"])
+    metadata["total_requests"] += 1
+
+class OutcomeLog:
+    """Append-only outcome log; lines are written on a worker thread, one at a time, off the event loop."""
+
+    def __init__(self, path: Path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = asyncio.Lock()
+
+    def _write(self, line: str):
+        self._file.write(line + "\n")
+        self._file.flush()
+
+    async def append(self, outcome: Dict):
+        line = json.dumps(outcome)
+        async with self._lock:
+            await asyncio.to_thread(self._write, line)
+
+    def close(self):
+        self._file.close()
+
+async def record_outcome(metadata: Dict, log: OutcomeLog, status: str, entry):
+    """Applies an outcome in memory and appends it to the log, instead of rewriting the whole JSON file."""
+    outcome = {"status": status, "entry": entry}
+    apply_outcome(metadata, outcome)
+    await log.append(outcome)
+
+# ==================== HTTP ====================
+class RateLimiter:
+    """Spaces request starts at least `interval` seconds apart across all coroutines."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+async def eutils_get(session: aiohttp.ClientSession, limiter: RateLimiter, endpoint: str, **params) -> bytes:
+    """
+    GET an E-utilities endpoint directly; Entrez's own calls block on urllib.
+    List values are sent as a repeated parameter.
+    """
+    params.update(tool=Entrez.tool, email=Entrez.email)
+    if Entrez.api_key:
+        params["api_key"] = Entrez.api_key
+    query = [
+        (key, str(item))
+        for key, value in params.items()
+        for item in (value if isinstance(value, list) else [value])
+    ]
+    await limiter.wait()
+    async with session.get(f"{EUTILS_URL}/{endpoint}", params=query) as response:
+        response.raise_for_status()
+        return await response.read()
 
 # ==================== PUBMED SEARCH ====================
 def search_pubmed(query: str, limit: int) -> List[str]:
@@ -69,70 +148,80 @@ def search_pubmed(query: str, limit: int) -> List[str]:
         return []
 
 # ==================== FETCH ARTICLE METADATA ====================
-def fetch_article_metadata(pmid: str) -> Optional[Dict]:
-    """Retrieve structured metadata (title, abstract, authors)."""
+def parse_article(pmid: str, article: Dict) -> Dict:
+    """Extract structured metadata (title, abstract, authors) from one efetch record."""
+    # Extract abstract
+    abstract = ""
+    if 'Abstract' in article:
+        abstract_texts = article['Abstract'].get('AbstractText', [])
+        if isinstance(abstract_texts, list):
+            abstract = ' '.join(str(text) for text in abstract_texts)
+        else:
+            abstract = str(abstract_texts)
+    
+    # Extract authors
+    authors = []
+    if 'AuthorList' in article:
+        for author in article['AuthorList']:
+            if 'LastName' in author and 'Initials' in author:
+                authors.append(f"{author['LastName']} {author['Initials']}")
+    
+    return {
+        "pmid": pmid,
+        "title": str(article.get('ArticleTitle', 'N/A')),
+        "abstract": abstract,
+        "authors": authors,
+        "journal": str(article.get('Journal', {}).get('Title', 'N/A'))
+    }
+
+async def fetch_article_metadata(session: aiohttp.ClientSession, limiter: RateLimiter, pmids: List[str]) -> Dict[str, Dict]:
+    """Retrieve metadata for a batch of PMIDs with one efetch call, keyed by PMID."""
     try:
-        handle = Entrez.efetch(
+        body = await eutils_get(
+            session, limiter, "efetch.fcgi",
             db="pubmed",
-            id=pmid,
+            id=",".join(pmids),
             rettype="medline",
             retmode="xml"
         )
-        records = Entrez.read(handle)
-        handle.close()
-        
-        if not records['PubmedArticle']:
-            return None
-            
-        article = records['PubmedArticle'][0]['MedlineCitation']['Article']
-        
-        # Extract abstract
-        abstract = ""
-        if 'Abstract' in article:
-            abstract_texts = article['Abstract'].get('AbstractText', [])
-            if isinstance(abstract_texts, list):
-                abstract = ' '.join(str(text) for text in abstract_texts)
-            else:
-                abstract = str(abstract_texts)
-        
-        # Extract authors
-        authors = []
-        if 'AuthorList' in article:
-            for author in article['AuthorList']:
-                if 'LastName' in author and 'Initials' in author:
-                    authors.append(f"{author['LastName']} {author['Initials']}")
-        
-        return {
-            "pmid": pmid,
-            "title": str(article.get('ArticleTitle', 'N/A')),
-            "abstract": abstract,
-            "authors": authors,
-            "journal": str(article.get('Journal', {}).get('Title', 'N/A'))
-        }
+        records = Entrez.read(io.BytesIO(body))
     except Exception as e:
-        logger.warning(f"Could not fetch metadata for PMID {pmid}: {e}")
-        return None
+        logger.warning(f"Could not fetch metadata for {len(pmids)} PMIDs starting at {pmids[0]}: {e}")
+        return {}
+    
+    articles = {}
+    for record in records['PubmedArticle']:
+        citation = record['MedlineCitation']
+        pmid = str(citation['PMID'])
+        articles[pmid] = parse_article(pmid, citation['Article'])
+    return articles
 
 # ==================== LINK TO PMC ====================
-def get_pmc_id(pmid: str) -> Optional[str]:
-    """Convert PMID to PMCID using elink."""
+async def get_pmc_ids(session: aiohttp.ClientSession, limiter: RateLimiter, pmids: List[str]) -> Dict[str, str]:
+    """Convert a batch of PMIDs to PMCIDs with one elink call; PMIDs without a PMC link are omitted."""
     try:
-        handle = Entrez.elink(dbfrom="pubmed", db="pmc", id=pmid)
-        results = Entrez.read(handle)
-        handle.close()
-        
-        if results and results[0].get("LinkSetDb"):
-            for linkset in results[0]["LinkSetDb"]:
-                if linkset["LinkName"] == "pubmed_pmc":
-                    pmc_id = linkset["Link"][0]["Id"]
-                    return pmc_id
-        return None
+        # One id parameter per PMID makes elink return a separate link set for each
+        body = await eutils_get(session, limiter, "elink.fcgi", dbfrom="pubmed", db="pmc", id=pmids)
+        results = Entrez.read(io.BytesIO(body))
     except Exception as e:
-        logger.debug(f"elink failed for PMID {pmid}: {e}")
-        return None
+        logger.debug(f"elink failed for {len(pmids)} PMIDs starting at {pmids[0]}: {e}")
+        return {}
+    
+    pmc_ids = {}
+    for result in results:
+        for linkset in result.get("LinkSetDb", []):
+            if linkset["LinkName"] == "pubmed_pmc" and linkset["Link"]:
+                pmc_ids[str(result["IdList"][0])] = linkset["Link"][0]["Id"]
+    return pmc_ids
+
+async def in_batches(fetch, session: aiohttp.ClientSession, limiter: RateLimiter, pmids: List[str]) -> Dict:
+    """Runs a batch fetcher over EUTILS_BATCH_SIZE slices of `pmids` concurrently and merges the results."""
+    batches = [pmids[i:i + EUTILS_BATCH_SIZE] for i in range(0, len(pmids), EUTILS_BATCH_SIZE)]
+    results = await asyncio.gather(*[fetch(session, limiter, batch) for batch in batches])
+    return {pmid: value for result in results for pmid, value in result.items()}
 
 # ==================== PDF DOWNLOAD ====================
-def download_pdf_from_pmc(pmcid: str, pmid: str) -> bool:
+async def download_pdf_from_pmc(session: aiohttp.ClientSession, limiter: RateLimiter, pmcid: str, pmid: str) -> bool:
     """
     Download PDF from PMC using official endpoint.
     """
@@ -146,25 +235,28 @@ def download_pdf_from_pmc(pmcid: str, pmid: str) -> bool:
             "Accept": "application/pdf"
         }
         
-        response = requests.get(pdf_url, headers=headers, timeout=30, stream=True)
-        
-        if response.status_code == 200 and response.headers.get('Content-Type', '').startswith('application/pdf'):
-            output_path = SAVE_DIR / f"PMC{pmcid}_{pmid}.pdf"
-            with open(output_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
-            file_size = output_path.stat().st_size
-            if file_size > 1000:  # At least 1KB
-                logger.info(f"✅ Downloaded: {output_path.name} ({file_size:,} bytes)")
-                return True
+        await limiter.wait()
+        async with session.get(pdf_url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            if response.status == 200 and response.headers.get('Content-Type', '').startswith('application/pdf'):
+                output_path = SAVE_DIR / f"PMC{pmcid}_{pmid}.pdf"
+                # Disk writes run on worker threads so other downloads keep streaming meanwhile
+                f = await asyncio.to_thread(open, output_path, "wb")
+                try:
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_BYTES):
+                        await asyncio.to_thread(f.write, chunk)
+                finally:
+                    await asyncio.to_thread(f.close)
             else:
-                logger.warning(f"File too small, likely not a valid PDF")
-                output_path.unlink()
+                logger.warning(f"PDF not available (status: {response.status})")
                 return False
+        
+        file_size = (await asyncio.to_thread(output_path.stat)).st_size
+        if file_size > 1000:  # At least 1KB
+            logger.info(f"✅ Downloaded: {output_path.name} ({file_size:,} bytes)")
+            return True
         else:
-            logger.warning(f"PDF not available (status: {response.status_code})")
+            logger.warning(f"File too small, likely not a valid PDF")
+            await asyncio.to_thread(output_path.unlink)
             return False
             
     except Exception as e:
@@ -194,60 +286,90 @@ def save_abstract_text(metadata: Dict, pmid: str, pmcid: Optional[str] = None):
         return False
 
 # ==================== MAIN EXECUTION ====================
-def main():
-    metadata = load_metadata()
-    
-    pmids = search_pubmed(SEARCH_QUERY, MAX_RESULTS)
-    
-    if not pmids:
-        logger.error("No PMIDs found!")
-        return
-    
-    for idx, pmid in enumerate(pmids, 1):
-        time.sleep(REQUEST_DELAY)
-        
-        logger.info(f"\n[{idx}/{len(pmids)}] Processing PMID: {pmid}")
+async def process_pmid(
+    pmid: str,
+    idx: int,
+    total: int,
+    article_meta: Optional[Dict],
+    pmcid: Optional[str],
+    session: aiohttp.ClientSession,
+    limiter: RateLimiter,
+    sem: asyncio.Semaphore,
+    metadata: Dict,
+    log: OutcomeLog
+):
+    """Downloads the PDF and saves the abstract for one PMID, recording the outcome in `metadata` and `log`."""
+    async with sem:
+        logger.info(f"\n[{idx}/{total}] Processing PMID: {pmid}")
         
-        # Fetch metadata
-        article_meta = fetch_article_metadata(pmid)
         if not article_meta:
             logger.warning(f"  Could not fetch metadata for PMID {pmid}")
-            metadata["failed"].append(pmid)
-            continue
+            await record_outcome(metadata, log, "failed", pmid)
+            return
         
         logger.info(f"  Title: {article_meta['title'][:60]}...")
         
-        time.sleep(REQUEST_DELAY)
-        
-        # Get PMC ID
-        pmcid = get_pmc_id(pmid)
-        
         if pmcid:
             logger.info(f"  Found PMCID: {pmcid}")
-            time.sleep(REQUEST_DELAY)
             
             # Try to download PDF
-            pdf_success = download_pdf_from_pmc(pmcid, pmid)
+            pdf_success = await download_pdf_from_pmc(session, limiter, pmcid, pmid)
             
             # Always save abstract
-            save_abstract_text(article_meta, pmid, pmcid)
+            await asyncio.to_thread(save_abstract_text, article_meta, pmid, pmcid)
             
+            # Coroutines share one event loop thread, so recording here is safe
             if pdf_success:
-                metadata["downloaded"].append({
+                await record_outcome(metadata, log, "downloaded", {
                     "pmid": pmid,
                     "pmcid": pmcid,
                     "timestamp": datetime.now().isoformat(),
                     "metadata": article_meta
                 })
             else:
-                metadata["failed"].append(pmid)
+                await record_outcome(metadata, log, "failed", pmid)
         else:
             logger.warning(f"  No PMCID found for PMID {pmid}")
             # Still save abstract
-            save_abstract_text(article_meta, pmid)
-            metadata["no_pmc"].append(pmid)
-        
-        metadata["total_requests"] += 1
+            await asyncio.to_thread(save_abstract_text, article_meta, pmid)
+            await record_outcome(metadata, log, "no_pmc", pmid)
+
+async def crawl(pmids: List[str], metadata: Dict):
+    """
+    Fetches all metadata, then all PMC links, in batched E-utilities calls, then
+    downloads PDFs concurrently; the limiter keeps the combined request rate within NCBI's limit.
+    """
+    limiter = RateLimiter(REQUEST_DELAY)
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY)
+    log = OutcomeLog(METADATA_LOG)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            articles = await in_batches(fetch_article_metadata, session, limiter, pmids)
+            logger.info(f"Fetched metadata for {len(articles)}/{len(pmids)} PMIDs")
+            
+            pmc_ids = await in_batches(get_pmc_ids, session, limiter, [pmid for pmid in pmids if pmid in articles])
+            logger.info(f"Found {len(pmc_ids)} PMCIDs")
+            
+            await asyncio.gather(*[
+                process_pmid(pmid, idx, len(pmids), articles.get(pmid), pmc_ids.get(pmid), session, limiter, sem, metadata, log)
+                for idx, pmid in enumerate(pmids, 1)
+            ])
+    finally:
+        log.close()
+
+def main():
+    metadata = load_metadata()
+    
+    pmids = search_pubmed(SEARCH_QUERY, MAX_RESULTS)
+    
+    if not pmids:
+        logger.error("No PMIDs found!")
+        return
+    
+    try:
+        asyncio.run(crawl(pmids, metadata))
+    finally:
         save_metadata(metadata)
     
     # Summary
@@ -259,4 +381,4 @@ def main():
     logger.info(f"Metadata saved to: {METADATA_FILE}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
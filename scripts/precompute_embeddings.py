@@ -0,0 +1,98 @@
+import os
+import sys
+import argparse
+import numpy as np
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.graph import Neo4jManager
+from src.local_index import (
+    FAISS_FILE, INT8_MATRIX_FILE, INT8_SCALES_FILE, build_faiss_index, create_chunk_matrix, normalize_rows, quantize, write_chunk_index
+)
+
+load_dotenv()
+
+BATCH_SIZE = 256
+# IVF needs ~39 training points per list; below this the exact scan is already fast
+MIN_FAISS_CHUNKS = 10_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export chunk embeddings from Neo4j into a local memory-mapped index")
+    parser.add_argument("--output-dir", type=Path, default=Path("data/index"),
+                        help="Directory for chunks.f16.mmap and chunks_index.json (default: data/index)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Chunks fetched per Neo4j round trip")
+    parser.add_argument("--precision", choices=["float16", "int8"], default=os.getenv("RAG_EMBED_PRECISION", "float16"),
+                        help="int8 also writes a per-row quantized copy (default: $RAG_EMBED_PRECISION or float16)")
+    parser.add_argument("--faiss", action="store_true", help="Also build a FAISS IVF-PQ index (needs the 'ann' extra)")
+    parser.add_argument("--faiss-factory", default="IVF1024,PQ32", help="FAISS index_factory string (default: IVF1024,PQ32)")
+    args = parser.parse_args()
+
+    neo4j = Neo4jManager()
+    try:
+        with neo4j.driver.session(database=neo4j.database) as session:
+            record = session.run("""
+                MATCH (c:Chunk) WHERE c.embedding IS NOT NULL
+                RETURN count(c) AS total, size(head(collect(c.embedding))) AS dim
+            """).single()
+            total, dim = record["total"], record["dim"]
+            if not total:
+                print("No chunk embeddings found. Run ingestion first.")
+                return
+
+            print(f"Exporting {total} chunk embeddings ({dim} dims)...")
+            matrix = create_chunk_matrix(args.output_dir, total, dim)
+            int8_matrix = create_chunk_matrix(args.output_dir, total, dim, np.int8) if args.precision == "int8" else None
+            int8_scales = []
+            chunk_ids = []
+
+            # Page by element id so each batch is one bounded round trip
+            page_query = """
+            MATCH (c:Chunk) WHERE c.embedding IS NOT NULL
+            RETURN elementId(c) AS id, c.embedding AS embedding
+            ORDER BY id
+            SKIP $skip LIMIT $limit
+            """
+            while len(chunk_ids) < total:
+                rows = session.run(page_query, skip=len(chunk_ids), limit=args.batch_size).data()
+                if not rows:
+                    break
+                start = len(chunk_ids)
+                batch = normalize_rows([r["embedding"] for r in rows])
+                matrix[start:start + len(rows)] = batch
+                if int8_matrix is not None:
+                    quantized, scales = quantize(batch)
+                    int8_matrix[start:start + len(rows)] = quantized
+                    int8_scales.append(scales)
+                chunk_ids.extend(r["id"] for r in rows)
+                print(f"  {len(chunk_ids)}/{total}")
+
+            matrix.flush()
+            if int8_matrix is not None:
+                int8_matrix.flush()
+                np.save(args.output_dir / INT8_SCALES_FILE, np.concatenate(int8_scales))
+            else:
+                # Drop an int8 copy left over from an earlier export so it is never scored against new ids
+                (args.output_dir / INT8_MATRIX_FILE).unlink(missing_ok=True)
+                (args.output_dir / INT8_SCALES_FILE).unlink(missing_ok=True)
+            write_chunk_index(args.output_dir, chunk_ids, (len(chunk_ids), dim))
+            print(f"✓ Wrote local chunk index to {args.output_dir}")
+
+            # A stale ANN index would point at the old row order
+            (args.output_dir / FAISS_FILE).unlink(missing_ok=True)
+            if args.faiss:
+                if len(chunk_ids) < MIN_FAISS_CHUNKS:
+                    print(f"Skipping FAISS index: {len(chunk_ids)} chunks is small enough for the exact scan.")
+                else:
+                    print(f"Training FAISS index ({args.faiss_factory})...")
+                    build_faiss_index(args.output_dir, matrix[:len(chunk_ids)], args.faiss_factory)
+                    print("✓ Wrote chunks.faiss")
+    finally:
+        neo4j.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,45 @@
 import json
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 # Add parent directory to path so we can import src
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.ingestion import MarkdownLoader
 
+PARSE_CHUNKSIZE = 4  # files handed to a worker per round trip
+
+def _parse_one(path: str) -> Optional[Tuple[Dict, Dict]]:
+    """Parses one markdown file in a worker process; returns (document, summary) or None on failure."""
+    file_path = Path(path)
+    try:
+        print(f"Processing {file_path.name}...")
+        loader = MarkdownLoader(file_path)
+        doc = loader.parse()
+        
+        summary = {
+            "id": doc.id,
+            "title": doc.title,
+            "authors": doc.authors,
+            "sections_count": len(doc.sections),
+            "source": str(file_path)
+        }
+        print(f"  ✓ Processed: {doc.title[:40]}... ({len(doc.sections)} sections)")
+        # Convert to dict for JSON serialization
+        return doc.model_dump(), summary
+        
+    except Exception as e:
+        print(f"  ✗ Failed to process {file_path.name}: {e}")
+        return None
+
 def main():
     input_dir = Path("data/markdowns")
     output_dir = Path("data/staging")
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    docs_output = output_dir / "structured_documents.json"
+    docs_output = output_dir / "structured_documents.jsonl"
     metadata_output = output_dir / "metadata.json"
     
     markdown_files = list(input_dir.glob("*.md"))
@@ -22,38 +48,21 @@ def main():
         print("No markdown files found in data/markdowns/")
         return
         
-    documents = []
     metadata_summary = []
     
     print(f"Found {len(markdown_files)} markdown files. Processing...")
     
-    for file_path in markdown_files:
-        try:
-            print(f"Processing {file_path.name}...")
-            loader = MarkdownLoader(file_path)
-            doc = loader.parse()
-            
-            # Convert to dict for JSON serialization
-            doc_dict = doc.model_dump()
-            documents.append(doc_dict)
-            
-            summary = {
-                "id": doc.id,
-                "title": doc.title,
-                "authors": doc.authors,
-                "sections_count": len(doc.sections),
-                "source": str(file_path)
-            }
+    # Parsing is pure-Python CPU work, so spread files across processes rather than threads.
+    # Documents are written one JSON line each as they arrive instead of held for one big dump.
+    with ProcessPoolExecutor() as executor, open(docs_output, "w", encoding="utf-8") as out:
+        for result in executor.map(_parse_one, [str(p) for p in markdown_files], chunksize=PARSE_CHUNKSIZE):
+            if result is None:
+                continue
+            doc_dict, summary = result
+            out.write(json.dumps(doc_dict, ensure_ascii=False) + "\n")
             metadata_summary.append(summary)
-            print(f"  ✓ Processed: {doc.title[:40]}... ({len(doc.sections)} sections)")
-            
-        except Exception as e:
-            print(f"  ✗ Failed to process {file_path.name}: {e}")
             
-    # Save results
-    print(f"\nSaving {len(documents)} documents to {docs_output}...")
-    with open(docs_output, "w", encoding="utf-8") as f:
-        json.dump(documents, f, indent=2, ensure_ascii=False)
+    print(f"\nSaved {len(metadata_summary)} documents to {docs_output}")
         
     print(f"Saving metadata summary to {metadata_output}...")
     with open(metadata_output, "w", encoding="utf-8") as f:
@@ -1,2 +0,0 @@
-import datetime
-from docling.do
\ No newline at end of file
@@ -0,0 +1,269 @@
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases, strips punctuation and collapses whitespace so trivial rewordings share a key."""
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+
+def cache_key(query: str, variant: str = "") -> str:
+    """
+    Stable hex key for a query, computed on its normalized form.
+    `variant` names the settings the result depends on (e.g. reranking), so each gets its own key.
+    """
+    key = normalize_query(query)
+    if variant:
+        key += "\x00" + variant
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float
+    size_bytes: int
+
+
+class SmartRAGCache:
+    """
+    In-process LRU + TTL cache for finished agent results.
+    Entries expire after `ttl_seconds`; once the estimated total size passes
+    `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, max_bytes: int = 100 * 1024 * 1024, ttl_seconds: float = 900):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        return len(json.dumps(value, default=str).encode("utf-8"))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size_bytes
+
+    def get(self, query: str, variant: str = "") -> Optional[Any]:
+        key = cache_key(query, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at < time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, query: str, value: Any, variant: str = "", stored_at: Optional[float] = None):
+        """Adds an entry; `stored_at` backdates entries restored from disk so they keep their original expiry."""
+        key = cache_key(query, variant)
+        size = self._estimate_size(value)
+        expires_at = (time.time() if stored_at is None else stored_at) + self.ttl_seconds
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(value, expires_at, size)
+            self._total_bytes += size
+            # Evict least recently used entries, but never the one just added
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+@dataclass
+class SemanticEntry:
+    vector: np.ndarray
+    query: str
+    value: Any
+    expires_at: float
+    variant: str = ""
+
+
+class SemanticCache:
+    """
+    Similarity cache over query embeddings for paraphrased questions.
+    Vectors are bucketed with random-projection LSH (`num_tables` tables of
+    `num_bits`-bit signatures); a lookup probes every table and returns the
+    stored value whose cosine similarity to the query passes the threshold.
+    Like SmartRAGCache, entries expire after `ttl_seconds` and the least
+    recently used are evicted past `max_entries`. Entries only match lookups
+    for the same `variant`, as with SmartRAGCache keys.
+    """
+
+    def __init__(
+        self,
+        num_tables: int = 8,
+        num_bits: int = 16,
+        threshold: float = 0.95,
+        seed: int = 42,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 900,
+    ):
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+        self.threshold = threshold
+        self.seed = seed
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._planes: Optional[np.ndarray] = None  # (num_tables, num_bits, dim), created on first vector
+        self._tables: List[Dict[bytes, Set[int]]] = [{} for _ in range(num_tables)]
+        self._entries: "OrderedDict[int, SemanticEntry]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _signatures(self, vec: np.ndarray) -> List[bytes]:
+        if self._planes is None:
+            rng = np.random.default_rng(self.seed)
+            self._planes = rng.standard_normal((self.num_tables, self.num_bits, vec.shape[0])).astype(np.float32)
+        signs = (self._planes @ vec) > 0
+        return [row.tobytes() for row in np.packbits(signs, axis=1)]
+
+    def _remove(self, idx: int):
+        entry = self._entries.pop(idx)
+        for table, signature in zip(self._tables, self._signatures(entry.vector)):
+            bucket = table.get(signature)
+            if bucket is not None:
+                bucket.discard(idx)
+                if not bucket:
+                    del table[signature]
+
+    def get(self, vector, threshold: Optional[float] = None, variant: str = "") -> Optional[Tuple[Any, float]]:
+        """Returns (value, similarity) for the closest live cached query above the threshold, else None."""
+        threshold = self.threshold if threshold is None else threshold
+        vec = self._normalize(vector)
+        now = time.time()
+        with self._lock:
+            candidates = set()
+            for table, signature in zip(self._tables, self._signatures(vec)):
+                candidates.update(table.get(signature, ()))
+            
+            best, best_score = None, threshold
+            for idx in candidates:
+                entry = self._entries[idx]
+                if entry.expires_at < now:
+                    self._remove(idx)
+                    continue
+                if entry.variant != variant:
+                    continue
+                score = float(entry.vector @ vec)
+                if score >= best_score:
+                    best, best_score = idx, score
+            
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return self._entries[best].value, best_score
+
+    def put(self, vector, query: str, value: Any, stored_at: Optional[float] = None, variant: str = ""):
+        """Adds an entry; `stored_at` backdates entries restored from disk so they keep their original expiry."""
+        vec = self._normalize(vector)
+        expires_at = (time.time() if stored_at is None else stored_at) + self.ttl_seconds
+        with self._lock:
+            idx = self._next_id
+            self._next_id += 1
+            self._entries[idx] = SemanticEntry(vec, query, value, expires_at, variant)
+            for table, signature in zip(self._tables, self._signatures(vec)):
+                table.setdefault(signature, set()).add(idx)
+            # Evict least recently used entries, but never the one just added
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class EmbeddingCache:
+    """
+    On-disk content-hash -> embedding store, so re-ingesting unchanged sections
+    skips the embedding call. Keys include the model name, so switching models
+    never returns stale vectors; values are stored as float32 bytes, the precision
+    the embedding API returns them in.
+    """
+
+    def __init__(self, path: str = "data/.embed_cache.db", model: str = ""):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings(key TEXT PRIMARY KEY, vector BLOB)")
+
+    def _key(self, text: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest() + ":" + self.model
+
+    def get_many(self, texts: List[str]) -> Dict[str, List[float]]:
+        """Cached vectors for whichever of `texts` have one, keyed by text."""
+        keys = {self._key(text): text for text in texts}
+        found = {}
+        with self._lock:
+            key_list = list(keys)
+            # SQLite caps bound parameters, so look keys up in slices
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, vector in rows:
+                    found[keys[key]] = np.frombuffer(vector, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        rows = [
+            (self._key(text), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings(key, vector) VALUES (?, ?)", rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -8,7 +8,17 @@ This module provides evaluation capabilities using RAGAS metrics to measure:
 - Context Recall: Measures if all relevant information was retrieved
 """
 
-from typing import List, Dict, Any
+import os
+import csv
+import json
+import time
+import hashlib
+import asyncio
+import queue
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional
 import pandas as pd
 from datetime import datetime
 
@@ -16,8 +26,15 @@ from datetime import datetime
 class RAGASEvaluator:
     """Evaluator for RAG system using RAGAS metrics"""
     
-    def __init__(self):
-        """Initialize the RAGAS evaluator with default metrics"""
+    def __init__(self, max_workers: int = 16):
+        """
+        Initialize the RAGAS evaluator with default metrics
+        
+        Args:
+            max_workers: Concurrent (sample, metric) jobs RAGAS runs per evaluate() call;
+                lower it to stay under provider rate limits
+        """
+        self.max_workers = max_workers
         # Don't import at init time to avoid circular dependencies
         self._ragas_imported = False
         self._evaluate = None
@@ -38,6 +55,7 @@ class RAGASEvaluator:
                     context_precision,
                     context_recall,
                 )
+                from ragas.run_config import RunConfig
                 from datasets import Dataset
                 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
                 import os
@@ -66,6 +84,7 @@ class RAGASEvaluator:
                 self._context_precision = context_precision
                 self._context_recall = context_recall
                 self._Dataset = Dataset
+                self._run_config = RunConfig(max_workers=self.max_workers)
                 self._ragas_imported = True
             except Exception as e:
                 raise ImportError(f"Failed to import RAGAS: {e}. Please ensure RAGAS is properly installed.")
@@ -149,7 +168,8 @@ class RAGASEvaluator:
             dataset, 
             metrics=metrics_to_use,
             llm=self._llm,
-            embeddings=self._embeddings
+            embeddings=self._embeddings,
+            run_config=self._run_config
         )
         
         # Convert result to dictionary format for easier access
@@ -200,11 +220,25 @@ class RAGASEvaluator:
             dataset, 
             metrics=metrics_to_use,
             llm=self._llm,
-            embeddings=self._embeddings
+            embeddings=self._embeddings,
+            run_config=self._run_config
         )
         
         return result.to_pandas()
     
+    async def aevaluate_batch(
+        self,
+        questions: List[str],
+        answers: List[str],
+        contexts: List[List[str]],
+        ground_truths: List[str] = None
+    ) -> pd.DataFrame:
+        """
+        Awaitable evaluate_batch. RAGAS already schedules every (sample, metric) job
+        concurrently, up to `max_workers`; this keeps the blocking call off the caller's loop.
+        """
+        return await asyncio.to_thread(self.evaluate_batch, questions, answers, contexts, ground_truths)
+    
     def get_hallucination_score(
         self,
         question: str,
@@ -254,11 +288,39 @@ class RAGASEvaluator:
 
 
 class EvaluationLogger:
-    """Logger for storing evaluation results"""
+    """
+    Logger for storing evaluation results.
+    Rows are appended through one open CSV handle and flushed per call; the file is
+    only rewritten when a row brings columns the existing header does not have.
+    """
     
     def __init__(self, log_file: str = "data/evaluation_logs.csv"):
         """Initialize the logger with a file path"""
         self.log_file = log_file
+        self._file = None
+        self._writer = None
+        self._fieldnames: List[str] = []
+        self._lock = threading.Lock()
+    
+    def _open(self, fieldnames: List[str]):
+        """Opens the append handle, adopting the header of an existing log if there is one."""
+        Path(self.log_file).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(self.log_file, "r", newline="", encoding="utf-8") as f:
+                header = next(csv.reader(f), None)
+        except FileNotFoundError:
+            header = None
+        self._fieldnames = header or fieldnames
+        self._file = open(self.log_file, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self._fieldnames)
+        if not header:
+            self._writer.writeheader()
+    
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = self._writer = None
     
     def log_evaluation(
         self,
@@ -289,22 +351,51 @@ class EvaluationLogger:
         if metadata:
             log_entry.update(metadata)
         
-        # Append to CSV
-        df = pd.DataFrame([log_entry])
-        try:
-            existing_df = pd.read_csv(self.log_file)
-            df = pd.concat([existing_df, df], ignore_index=True)
-        except FileNotFoundError:
-            pass
-        
-        df.to_csv(self.log_file, index=False)
+        with self._lock:
+            if self._file is None:
+                self._open(list(log_entry))
+            
+            if set(log_entry) - set(self._fieldnames):
+                # New columns: rewrite once with the widened header, then keep appending
+                self._file.close()
+                self._file = None
+                df = pd.concat([pd.read_csv(self.log_file), pd.DataFrame([log_entry])], ignore_index=True)
+                df.to_csv(self.log_file, index=False)
+                self._open(list(df.columns))
+                return
+            
+            self._writer.writerow(log_entry)
+            self._file.flush()
     
     def get_evaluation_history(self) -> pd.DataFrame:
-        """Get all evaluation history"""
+        """
+        Get all evaluation history.
+        The CSV stays the append log; a Parquet snapshot next to it (native dtypes,
+        parsed timestamps) is read instead whenever no rows were appended since it was written.
+        """
+        snapshot = Path(self.log_file).with_suffix(".parquet")
         try:
-            return pd.read_csv(self.log_file)
+            csv_mtime = os.path.getmtime(self.log_file)
         except FileNotFoundError:
             return pd.DataFrame()
+        
+        if snapshot.exists() and snapshot.stat().st_mtime >= csv_mtime:
+            try:
+                return pd.read_parquet(snapshot)
+            except Exception as e:
+                print(f"Ignoring unreadable evaluation snapshot at {snapshot}: {e}")
+        
+        df = pd.read_csv(self.log_file)
+        if 'timestamp' in df.columns:
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+        try:
+            df.to_parquet(snapshot, index=False)
+            # Stamp with the CSV's mtime, so rows appended while this ran invalidate it
+            os.utime(snapshot, (csv_mtime, csv_mtime))
+        except Exception as e:
+            # Parquet needs pyarrow; without it the CSV is simply parsed every time
+            print(f"Could not write evaluation snapshot: {e}")
+        return df
     
     def get_average_metrics(self) -> Dict[str, float]:
         """Get average metrics across all evaluations"""
@@ -316,3 +407,145 @@ class EvaluationLogger:
         available_metrics = [col for col in metric_columns if col in df.columns]
         
         return df[available_metrics].mean().to_dict()
+
+
+class EvaluationQueue:
+    """
+    Runs RAGAS off the request path. Submitted turns are collected by a daemon
+    worker and scored in batches of up to `batch_size` through one evaluate() call;
+    results are kept per turn id for the UI to pick up once they land.
+    """
+    
+    def __init__(
+        self,
+        evaluator: RAGASEvaluator,
+        logger: Optional[EvaluationLogger] = None,
+        batch_size: int = 8,
+        max_wait_seconds: float = 2.0,
+        max_results: int = 1000
+    ):
+        self.evaluator = evaluator
+        self.logger = logger
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.max_results = max_results
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Scores by (question, answer, contexts) digest; cached and repeated answers are not re-scored
+        self._scores: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="ragas-eval", daemon=True)
+        self._worker.start()
+    
+    def submit(
+        self,
+        turn_id: str,
+        question: str,
+        answer: str,
+        contexts: List[str],
+        metadata: Dict[str, Any] = None,
+        log: bool = False
+    ):
+        """
+        Queues a turn for evaluation; `log` also appends its metrics to the evaluation log.
+        A turn whose question, answer and contexts were already scored reuses those scores,
+        and one with no non-blank contexts or a blank answer is scored 0 without RAGAS
+        and marked with a "skipped" reason.
+        """
+        contexts = [c for c in contexts if c and c.strip()]
+        if not contexts or not answer.strip():
+            # Nothing to ground against (or nothing to grade): both metrics are 0 without an LLM call.
+            # Still logged, so the dashboard counts these turns among the hallucination risks.
+            metrics = {
+                "faithfulness": 0.0,
+                "answer_relevancy": 0.0,
+                "skipped": "no contexts" if not contexts else "blank answer",
+            }
+            self._store(turn_id, metrics)
+            if log:
+                self._log(turn_id, question, answer, contexts, metrics, metadata)
+            return
+        
+        key = self._digest(question, answer, contexts)
+        with self._lock:
+            scores = self._scores.get(key)
+        if scores is not None:
+            self._store(turn_id, scores)
+            return
+        self._queue.put({
+            "key": key,
+            "turn_id": turn_id,
+            "question": question,
+            "answer": answer,
+            "contexts": contexts,
+            "metadata": metadata,
+            "log": log,
+        })
+    
+    @staticmethod
+    def _digest(question: str, answer: str, contexts: List[str]) -> str:
+        payload = json.dumps([question, answer, contexts], ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    
+    def result(self, turn_id: str) -> Optional[Dict[str, Any]]:
+        """Metric scores for a turn, {"error": ...} if its batch failed, or None while pending."""
+        with self._lock:
+            return self._results.get(turn_id)
+    
+    def _collect_batch(self) -> List[Dict[str, Any]]:
+        """Blocks for the first item, then waits up to `max_wait_seconds` to fill the batch."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _log(self, turn_id: str, question: str, answer: str, contexts: List[str], metrics: Dict[str, Any], metadata):
+        if self.logger is None:
+            return
+        try:
+            self.logger.log_evaluation(
+                question=question,
+                answer=answer,
+                contexts=contexts,
+                metrics=metrics,
+                metadata=metadata
+            )
+        except Exception as e:
+            print(f"Failed to log evaluation for turn {turn_id}: {e}")
+    
+    def _store(self, turn_id: str, value: Dict[str, Any]):
+        with self._lock:
+            self._results[turn_id] = value
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+    
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                df = self.evaluator.evaluate_batch(
+                    questions=[item["question"] for item in batch],
+                    answers=[item["answer"] for item in batch],
+                    contexts=[item["contexts"] for item in batch]
+                )
+                rows = df.to_dict("records")
+            except Exception as e:
+                for item in batch:
+                    self._store(item["turn_id"], {"error": str(e)})
+                continue
+            
+            for item, metrics in zip(batch, rows):
+                self._store(item["turn_id"], metrics)
+                with self._lock:
+                    self._scores[item["key"]] = metrics
+                    while len(self._scores) > self.max_results:
+                        self._scores.popitem(last=False)
+                if item["log"]:
+                    self._log(item["turn_id"], item["question"], item["answer"], item["contexts"], metrics, item["metadata"])
@@ -0,0 +1,17 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# One pool for every blocking call made from async code (embedding HTTP requests,
+# local matrix scoring, cross-encoder inference) so the event loop never stalls on them
+BLOCKING_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RAG_BLOCKING_WORKERS", str(os.cpu_count() or 4))),
+    thread_name_prefix="medgraph-blocking"
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Runs a synchronous callable on the shared pool and awaits its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(BLOCKING_POOL, functools.partial(func, *args, **kwargs))
@@ -1,76 +1,184 @@
 import os
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, AsyncGraphDatabase
 from typing import List, Dict
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Batched ingest writes: one UNWIND per call, linking each row to its parent node
+SECTIONS_QUERY = """
+UNWIND $rows AS row
+MERGE (s:Section {id: row.id})
+SET s.title = row.title,
+    s.level = row.level
+
+WITH s, row
+MATCH (d:Document {id: row.document_id})
+MERGE (s)-[:PART_OF]->(d)
+"""
+
+DOCUMENTS_QUERY = """
+UNWIND $rows AS row
+MERGE (d:Document {id: row.id})
+SET d.title = row.title,
+    d.year = row.year,
+    d.authors = row.authors,
+    d.source = row.source_path
+"""
+
+CHUNKS_QUERY = """
+UNWIND $rows AS row
+MERGE (c:Chunk {id: row.id})
+SET c.content = row.content
+// Stored as a float32 array rather than a list of 64-bit floats: half the bytes, same vector index
+WITH c, row
+CALL db.create.setNodeVectorProperty(c, 'embedding', row.embedding)
+
+WITH c, row
+MATCH (s:Section {id: row.section_id})
+MERGE (c)-[:PART_OF]->(s)
+"""
+
+TRIPLET_BATCH_SIZE = 10_000
+
 class Neo4jManager:
     def __init__(self):
         uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
         username = os.getenv("NEO4J_USERNAME", "neo4j")
         password = os.getenv("NEO4J_PASSWORD", "password")
-        self.driver = GraphDatabase.driver(uri, auth=(username, password))
+        pool_size = int(os.getenv("NEO4J_MAX_POOL", "50"))
+        acquisition_timeout = os.getenv("NEO4J_ACQ_TIMEOUT")
+        # Naming the database on every session skips the driver's home-database lookup
+        self.database = os.getenv("NEO4J_DATABASE", "neo4j")
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=(username, password),
+            max_connection_pool_size=pool_size,
+            connection_acquisition_timeout=float(acquisition_timeout or 30),
+            max_connection_lifetime=3600,
+            keep_alive=True
+        )
+        # Async driver for the query path. It binds to the event loop it is first used on,
+        # so it is created lazily from inside that loop.
+        self._async_driver = None
+        # The query path fails fast on an exhausted pool unless a timeout is configured
+        self._async_driver_args = (uri, (username, password), pool_size, float(acquisition_timeout or 5))
+
+    @property
+    def async_driver(self):
+        if self._async_driver is None:
+            uri, auth, pool_size, acquisition_timeout = self._async_driver_args
+            self._async_driver = AsyncGraphDatabase.driver(
+                uri,
+                auth=auth,
+                max_connection_pool_size=pool_size,
+                connection_acquisition_timeout=acquisition_timeout,
+                max_connection_lifetime=3600,
+                keep_alive=True
+            )
+        return self._async_driver
+
+    def pool_stats(self) -> Dict[str, int]:
+        """
+        In-use and idle connection counts of the sync driver's pool, for diagnostics.
+        Reads driver internals, so returns an empty dict if they are not available.
+        """
+        try:
+            connections = [conn for conns in self.driver._pool.connections.values() for conn in conns]
+        except AttributeError:
+            return {}
+        in_use = sum(1 for conn in connections if getattr(conn, "in_use", False))
+        return {"in_use": in_use, "idle": len(connections) - in_use}
 
     def close(self):
         self.driver.close()
 
-    def add_document(self, doc: Dict):
-        """Creates the Document node."""
-        query = """
-        MERGE (d:Document {id: $id})
-        SET d.title = $title,
-            d.year = $year,
-            d.authors = $authors,
-            d.source = $source_path
-        """
-        with self.driver.session() as session:
-            session.run(query, 
-                        id=doc.get("id"),
-                        title=doc.get("title"),
-                        year=doc.get("year"),
-                        authors=doc.get("authors"),
-                        source_path=doc.get("source_path"))
+    async def aclose(self):
+        if self._async_driver is not None:
+            await self._async_driver.close()
+
+    def add_document(self, doc: Dict, sections: List[Dict] = None):
+        """
+        Creates the Document node, and its Section nodes in the same transaction when
+        `sections` is given. execute_write retries the transaction on transient errors.
+        """
+        def write(tx):
+            tx.run(DOCUMENTS_QUERY, rows=self._document_rows([doc])).consume()
+            if sections:
+                tx.run(SECTIONS_QUERY, rows=self._section_rows(sections)).consume()
+
+        with self.driver.session(database=self.database) as session:
+            session.execute_write(write)
+
+    def add_documents(self, docs: List[Dict]):
+        """Creates Document nodes in one UNWIND write; sections are left to add_sections."""
+        if not docs:
+            return
+        rows = self._document_rows(docs)
+        with self.driver.session(database=self.database) as session:
+            session.execute_write(lambda tx: tx.run(DOCUMENTS_QUERY, rows=rows).consume())
+
+    @staticmethod
+    def _document_rows(docs: List[Dict]) -> List[Dict]:
+        # Only scalar properties; a document dict also carries its nested sections
+        return [
+            {
+                "id": doc.get("id"),
+                "title": doc.get("title"),
+                "year": doc.get("year"),
+                "authors": doc.get("authors"),
+                "source_path": doc.get("source_path"),
+            }
+            for doc in docs
+        ]
+
+    @staticmethod
+    def _section_rows(sections: List[Dict]) -> List[Dict]:
+        return [
+            {
+                "id": section.get("id"),
+                "title": section.get("title"),
+                "level": section.get("level"),
+                "document_id": section.get("document_id"),
+            }
+            for section in sections
+        ]
 
     def add_section(self, section: Dict):
         """Creates Section node and links to Document."""
-        query = """
-        MERGE (s:Section {id: $id})
-        SET s.title = $title,
-            s.level = $level
-        
-        WITH s
-        MATCH (d:Document {id: $document_id})
-        MERGE (s)-[:PART_OF]->(d)
-        """
-        with self.driver.session() as session:
-            session.run(query,
-                        id=section.get("id"),
-                        title=section.get("title"),
-                        level=section.get("level"),
-                        document_id=section.get("document_id"))
+        self.add_sections([section])
+
+    def add_sections(self, sections: List[Dict]):
+        """Creates Section nodes and links them to their Documents in one UNWIND write."""
+        if not sections:
+            return
+        rows = self._section_rows(sections)
+        with self.driver.session(database=self.database) as session:
+            session.execute_write(lambda tx: tx.run(SECTIONS_QUERY, rows=rows).consume())
 
     def add_chunk(self, chunk: Dict):
         """Creates Chunk node and links to Section."""
-        query = """
-        MERGE (c:Chunk {id: $id})
-        SET c.content = $content,
-            c.embedding = $embedding
-        
-        WITH c
-        MATCH (s:Section {id: $section_id})
-        MERGE (c)-[:PART_OF]->(s)
-        """
-        with self.driver.session() as session:
-            session.run(query,
-                        id=chunk.get("id"),
-                        content=chunk.get("content"),
-                        embedding=chunk.get("embedding"),
-                        section_id=chunk.get("section_id"))
+        self.add_chunks([chunk])
 
-    def add_triplets(self, triplets: List[Dict]):
+    def add_chunks(self, chunks: List[Dict]):
+        """Creates Chunk nodes and links them to their Sections in one UNWIND write."""
+        if not chunks:
+            return
+        rows = [
+            {
+                "id": chunk.get("id"),
+                "content": chunk.get("content"),
+                "embedding": chunk.get("embedding"),
+                "section_id": chunk.get("section_id"),
+            }
+            for chunk in chunks
+        ]
+        with self.driver.session(database=self.database) as session:
+            session.execute_write(lambda tx: tx.run(CHUNKS_QUERY, rows=rows).consume())
+
+    def add_triplets(self, triplets: List[Dict], batch_size: int = TRIPLET_BATCH_SIZE):
         """
-        Batch inserts triplets.
+        Batch inserts triplets, `batch_size` rows per UNWIND transaction.
         triplet: {head, head_type, relation, tail, tail_type, source_doc_id...}
         """
         if not triplets:
@@ -81,11 +189,11 @@ class Neo4jManager:
         
         // Merge Head Entity
         MERGE (h:Entity {name: row.head})
-        ON CREATE SET h.type = row.head_type
+        ON CREATE SET h.type = row.head_type, h.name_lower = toLower(row.head)
         
         // Merge Tail Entity
         MERGE (t:Entity {name: row.tail})
-        ON CREATE SET t.type = row.tail_type
+        ON CREATE SET t.type = row.tail_type, t.name_lower = toLower(row.tail)
         
         // Create Relationship (Dynamic types are tricky in Cypher, usually requires APOC or filtered MERGE)
         // For simplicity in this prototype, we'll use a generic RELATION relationship with a type property
@@ -111,9 +219,9 @@ class Neo4jManager:
         apoc_query = """
         UNWIND $batch AS row
         MERGE (h:Entity {name: row.head})
-        ON CREATE SET h.type = row.head_type
+        ON CREATE SET h.type = row.head_type, h.name_lower = toLower(row.head)
         MERGE (t:Entity {name: row.tail})
-        ON CREATE SET t.type = row.tail_type
+        ON CREATE SET t.type = row.tail_type, t.name_lower = toLower(row.tail)
         WITH h, t, row
         CALL apoc.merge.relationship(h, row.relation, {}, {}, t, {}) YIELD rel
         SET rel.source_doc_id = row.source_doc_id,
@@ -121,9 +229,11 @@ class Neo4jManager:
         RETURN count(rel)
         """
         
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             try:
-                session.run(apoc_query, batch=triplets)
+                for start in range(0, len(triplets), batch_size):
+                    batch = triplets[start:start + batch_size]
+                    session.execute_write(lambda tx: tx.run(apoc_query, batch=batch).consume())
             except Exception as e:
                 print(f"Failed to use APOC for relationships: {e}")
                 print("Falling back to generic RELATED_TO edges.")
@@ -149,13 +259,61 @@ class Neo4jManager:
             `vector.similarity_function`: 'cosine'
         }}}}
         """
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             try:
                 session.run(query, dimension=dimension)
                 print(f"Vector index '{index_name}' created/verified.")
             except Exception as e:
                 print(f"Error creating vector index: {e}")
 
+    def create_entity_name_index(self, index_name: str = "entity_name"):
+        """
+        Creates a range index on Entity.name. Triplet MERGEs and the evidence-graph
+        `name IN $entities` lookups seek on it instead of scanning every Entity node.
+        """
+        query = f"CREATE INDEX {index_name} IF NOT EXISTS FOR (e:Entity) ON (e.name)"
+        with self.driver.session(database=self.database) as session:
+            try:
+                session.run(query)
+                print(f"Range index '{index_name}' created/verified.")
+            except Exception as e:
+                print(f"Error creating range index: {e}")
+
+    def create_entity_name_lower_index(self, index_name: str = "entity_name_lower"):
+        """
+        Indexes Entity.name_lower (Neo4j has no expression indexes, so the lowercased
+        name is stored as a property) and backfills it on entities ingested before
+        add_triplets started setting it. Exact case-insensitive name lookups seek on it.
+        """
+        query = f"CREATE INDEX {index_name} IF NOT EXISTS FOR (e:Entity) ON (e.name_lower)"
+        backfill_query = """
+        MATCH (e:Entity) WHERE e.name_lower IS NULL AND e.name IS NOT NULL
+        SET e.name_lower = toLower(e.name)
+        """
+        with self.driver.session(database=self.database) as session:
+            try:
+                session.run(query)
+                session.run(backfill_query)
+                print(f"Range index '{index_name}' created/verified.")
+            except Exception as e:
+                print(f"Error creating range index: {e}")
+
+    def create_entity_fulltext_index(self, index_name: str = "entityNameFts"):
+        """
+        Creates a full-text (Lucene) index on Entity names, used to find the
+        entities mentioned in retrieved text without scanning every Entity node.
+        """
+        query = f"""
+        CREATE FULLTEXT INDEX {index_name} IF NOT EXISTS
+        FOR (e:Entity) ON EACH [e.name]
+        """
+        with self.driver.session(database=self.database) as session:
+            try:
+                session.run(query)
+                print(f"Full-text index '{index_name}' created/verified.")
+            except Exception as e:
+                print(f"Error creating full-text index: {e}")
+
     def create_community_index(self):
         """
         Runs GDS Leiden algorithm to detect communities and write back 'communityId'.
@@ -189,7 +347,7 @@ class Neo4jManager:
         # 3. Drop projection
         drop_query = f"CALL gds.graph.drop('{projection_name}') YIELD graphName"
         
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             try:
                 # Check GDS
                 try:
@@ -234,7 +392,7 @@ class Neo4jManager:
         
         G = nx.Graph()
         
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             result = session.run(query)
             edges = [(r["source"], r["target"]) for r in result]
             
@@ -263,7 +421,7 @@ class Neo4jManager:
         batch = []
         count = 0
         
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             for name, community_id in partition.items():
                 batch.append({"name": name, "community_id": community_id})
                 if len(batch) >= batch_size:
@@ -294,7 +452,7 @@ class Neo4jManager:
         
         G = nx.Graph()
         
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             result = session.run(query)
             edges = [(r["source"], r["target"]) for r in result]
             
@@ -324,7 +482,7 @@ class Neo4jManager:
             batch = []
             count = 0
             
-            with self.driver.session() as session:
+            with self.driver.session(database=self.database) as session:
                 for name, community_id in partition.items():
                     batch.append({"name": name, "community_id": community_id})
                     if len(batch) >= batch_size:
@@ -354,9 +512,22 @@ class Neo4jManager:
         RETURN comId, entities
         LIMIT 100
         """
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             result = session.run(query)
             return [{"communityId": r["comId"], "entities": r["entities"]} for r in result]
 
+    async def aget_community_summaries(self):
+        """Async variant of get_community_summaries() on the pooled async driver."""
+        query = """
+        MATCH (e:Entity)
+        WHERE e.communityId IS NOT NULL
+        WITH e.communityId AS comId, collect(e.name) AS entities
+        RETURN comId, entities
+        LIMIT 100
+        """
+        async with self.async_driver.session(database=self.database) as session:
+            result = await session.run(query)
+            return [{"communityId": r["comId"], "entities": r["entities"]} async for r in result]
+
 
 
@@ -2,7 +2,7 @@ import os
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 
 load_dotenv()
 
@@ -16,8 +16,8 @@ class Triplet(BaseModel):
 class TripletList(BaseModel):
     triplets: List[Triplet]
 
-def get_llm():
-    """Returns an instance of ChatGoogleGenerativeAI."""
+def get_llm(timeout: Optional[float] = None):
+    """Returns an instance of ChatGoogleGenerativeAI. `timeout` is the per-request timeout in seconds."""
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_API_KEY not found in environment variables.")
@@ -25,7 +25,8 @@ def get_llm():
     return ChatGoogleGenerativeAI(
         model="gemini-2.0-flash", 
         temperature=0.7, # Thinking models often perform better with some temperature
-        google_api_key=api_key
+        google_api_key=api_key,
+        timeout=timeout
     )
 
 def get_embeddings():
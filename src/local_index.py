@@ -0,0 +1,147 @@
+import json
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+
+MATRIX_FILE = "chunks.f16.mmap"
+INT8_MATRIX_FILE = "chunks.i8.mmap"
+INT8_SCALES_FILE = "chunks_scales.npy"
+INDEX_FILE = "chunks_index.json"
+FAISS_FILE = "chunks.faiss"
+SCORE_BLOCK_ROWS = 65536
+FAISS_NPROBE = 32
+
+
+def normalize_rows(matrix) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def quantize(matrix) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization; returns (int8 rows, float32 per-row scales)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(matrix).max(axis=1) / 127
+    scales[scales == 0] = 1
+    quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def create_chunk_matrix(output_dir: Path, num_rows: int, dim: int, dtype=np.float16) -> np.memmap:
+    """Allocates the memmap that rows are streamed into (float16, or int8 for the quantized copy)."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    filename = INT8_MATRIX_FILE if np.dtype(dtype) == np.int8 else MATRIX_FILE
+    return np.memmap(output_dir / filename, dtype=dtype, mode="w+", shape=(num_rows, dim))
+
+
+def write_chunk_index(output_dir: Path, chunk_ids: List[str], shape: Tuple[int, int]):
+    """Writes the sidecar holding the row order (Neo4j element ids) and matrix shape."""
+    with open(Path(output_dir) / INDEX_FILE, "w", encoding="utf-8") as f:
+        json.dump({"ids": chunk_ids, "shape": list(shape), "dtype": "float16"}, f)
+
+
+def build_faiss_index(output_dir: Path, matrix: np.ndarray, factory: str = "IVF1024,PQ32"):
+    """Trains an inner-product FAISS index over the normalized matrix and writes it next to the memmap."""
+    try:
+        import faiss
+    except ImportError as e:
+        raise ImportError(f"Failed to import faiss: {e}. Install the 'ann' extra to build an ANN index.")
+
+    vectors = np.ascontiguousarray(matrix, dtype=np.float32)
+    index = faiss.index_factory(vectors.shape[1], factory, faiss.METRIC_INNER_PRODUCT)
+    index.train(vectors)
+    index.add(vectors)
+    faiss.write_index(index, str(Path(output_dir) / FAISS_FILE))
+
+
+class LocalChunkIndex:
+    """
+    Cosine search over chunk embeddings exported from Neo4j
+    (see scripts/precompute_embeddings.py). Uses the FAISS ANN index when
+    one was built, otherwise an exact matmul against the float16 memmap.
+    """
+
+    def __init__(self, ids: List[str], matrix: np.ndarray, ann_index=None, scales: Optional[np.ndarray] = None):
+        self.ids = ids
+        self.matrix = matrix
+        self.ann_index = ann_index
+        self.scales = scales  # set when `matrix` holds int8 rows
+
+    @classmethod
+    def load(cls, index_dir: Path, precision: str = "float16") -> Optional["LocalChunkIndex"]:
+        """
+        Opens an exported index, or returns None if it has not been built.
+        With precision="int8" the quantized copy is scored instead, if it was exported.
+        """
+        index_dir = Path(index_dir)
+        if not (index_dir / INDEX_FILE).exists() or not (index_dir / MATRIX_FILE).exists():
+            return None
+        with open(index_dir / INDEX_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        shape = tuple(meta["shape"])
+        ann_index = cls._load_faiss(index_dir / FAISS_FILE)
+
+        if precision == "int8":
+            if (index_dir / INT8_MATRIX_FILE).exists() and (index_dir / INT8_SCALES_FILE).exists():
+                matrix = np.memmap(index_dir / INT8_MATRIX_FILE, dtype=np.int8, mode="r", shape=shape)
+                return cls(meta["ids"], matrix, ann_index, scales=np.load(index_dir / INT8_SCALES_FILE))
+            print(f"No int8 export in {index_dir}; scoring the float16 matrix instead.")
+
+        matrix = np.memmap(index_dir / MATRIX_FILE, dtype=np.float16, mode="r", shape=shape)
+        return cls(meta["ids"], matrix, ann_index)
+
+    @staticmethod
+    def _load_faiss(path: Path):
+        if not path.exists():
+            return None
+        try:
+            import faiss
+        except ImportError:
+            print(f"Found {path} but faiss is not installed; falling back to exact search.")
+            return None
+        try:
+            index = faiss.read_index(str(path), faiss.IO_FLAG_MMAP)
+        except RuntimeError as e:
+            print(f"Failed to load {path}: {e}; falling back to exact search.")
+            return None
+        # nprobe only exists on IVF indexes; flat and HNSW factories have nothing to tune
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = FAISS_NPROBE
+        return index
+
+    def search(self, query_embedding, k: int) -> List[Tuple[str, float]]:
+        """Returns up to k (chunk_id, cosine score) pairs, best first."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return []
+
+        if self.ann_index is not None:
+            scores, rows = self.ann_index.search(query[None, :], k)
+            return [(self.ids[i], float(score)) for i, score in zip(rows[0], scores[0]) if i >= 0]
+
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        if self.scales is not None:
+            # Quantize the query too and accumulate int8 x int8 products in int32 (no overflow below
+            # ~130k dims), so blocks are never widened to float; one multiply by row scale x query scale
+            q_int8, q_scale = quantize(query[None, :])
+            q_int32 = q_int8[0].astype(np.int32)
+            for start in range(0, len(self.ids), SCORE_BLOCK_ROWS):
+                block = self.matrix[start:start + SCORE_BLOCK_ROWS]
+                block_scores = block.astype(np.int32) @ q_int32
+                scores[start:start + len(block)] = block_scores * (self.scales[start:start + len(block)] * q_scale[0])
+        else:
+            # NumPy has no fp16 BLAS kernel, so upcast one block at a time and matmul in fp32
+            for start in range(0, len(self.ids), SCORE_BLOCK_ROWS):
+                block = self.matrix[start:start + SCORE_BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ query
+
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(self.ids) else np.arange(len(self.ids))
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top]
@@ -26,3 +26,49 @@ RELATION_EXTRACTION_PROMPT = ChatPromptTemplate.from_messages([
     ("system", RELATION_EXTRACTION_SYSTEM_PROMPT),
     ("human", "Extract relations from the following text:\n\n{text}"),
 ])
+
+# Reasoning agent prompts. The instructions live in the system message so every call
+# shares an identical prefix (eligible for provider-side prefix caching); only the
+# human message carries the per-query variables.
+
+PLAN_SYSTEM_PROMPT = """Break down the user's query into 2-3 step-by-step search tasks."""
+
+PLAN_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", PLAN_SYSTEM_PROMPT),
+    ("human", "{query}"),
+])
+
+REFLECTION_SYSTEM_PROMPT = """You are given a query and the context retrieved so far.
+Do we have enough information to answer the query?
+Reply YES or NO."""
+
+REFLECTION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", REFLECTION_SYSTEM_PROMPT),
+    ("human", "Query: {query}\nCurrent Context: {context}"),
+])
+
+SYNTHESIS_SYSTEM_PROMPT = """Answer the query based strictly on the context provided.
+
+IMPORTANT: When you reference information from a source, add a citation marker like [1], [2], etc.
+The numbers correspond to the source numbers in the context.
+
+Provide a comprehensive answer with inline citations."""
+
+SYNTHESIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYNTHESIS_SYSTEM_PROMPT),
+    ("human", "Query: {query}\n\nContext:\n{context}"),
+])
+
+FOLLOWUP_SYSTEM_PROMPT = """Based on a medical research answer and the entities discovered, generate 3 follow-up questions that would help explore the knowledge graph deeper.
+
+Generate questions that:
+1. Explore related biological pathways or mechanisms
+2. Find connections to other diseases or conditions  
+3. Discover recent research trends or contradictory findings
+
+Return ONLY the questions, one per line, without numbering."""
+
+FOLLOWUP_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", FOLLOWUP_SYSTEM_PROMPT),
+    ("human", "Answer: {answer}...\n\nKey Entities: {entities}"),
+])
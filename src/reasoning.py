@@ -1,10 +1,17 @@
-from typing import TypedDict, List, Annotated, Dict, Any
+import os
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import TypedDict, List, Annotated, Dict, Any, Optional
 import operator
 from datetime import datetime
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import SystemMessage, HumanMessage
 from .llm import get_llm
 from .retriever import HybridRetriever
+from .graph import Neo4jManager
+from .reranker import CrossEncoderReranker
+from .executor import run_blocking
+from .prompts import PLAN_PROMPT, REFLECTION_PROMPT, SYNTHESIS_PROMPT, FOLLOWUP_PROMPT
 
 class AgentState(TypedDict):
     """The detailed state of the reasoning agent."""
@@ -16,11 +23,35 @@ class AgentState(TypedDict):
     reflection: str
     execution_events: Annotated[List[Dict[str, Any]], operator.add]
     execution_summary: Dict[str, Any]
+    rerank_enabled: bool
+
+@dataclass
+class AgentConfig:
+    """Tuning knobs for the reasoning agent, overridable through RAG_* environment variables."""
+    top_k: int = 5
+    rerank_enabled: bool = False
+    rerank_candidates: int = 30
+    rerank_top_n: int = 8
+    client_timeout_ms: int = 60000
+    warmup: bool = False
+    parallel_steps: bool = False
+
+    @classmethod
+    def from_env(cls) -> "AgentConfig":
+        return cls(
+            top_k=int(os.getenv("RAG_TOP_K", "5")),
+            rerank_enabled=os.getenv("RAG_RERANK_ENABLED", "false").lower() == "true",
+            client_timeout_ms=int(os.getenv("RAG_CLIENT_TIMEOUT_MS", "60000")),
+            warmup=os.getenv("RAG_WARMUP", "false").lower() == "true",
+            parallel_steps=os.getenv("RAG_PARALLEL_STEPS", "false").lower() == "true",
+        )
 
 class ReasoningAgent:
-    def __init__(self):
-        self.llm = get_llm()
-        self.retriever = HybridRetriever()
+    def __init__(self, config: Optional[AgentConfig] = None, neo4j: Optional[Neo4jManager] = None):
+        self.config = config or AgentConfig.from_env()
+        self.llm = get_llm(timeout=self.config.client_timeout_ms / 1000)
+        self.retriever = HybridRetriever(top_k=self.config.top_k, neo4j=neo4j)
+        self.reranker = CrossEncoderReranker()
         
         # Build Graph
         builder = StateGraph(AgentState)
@@ -44,11 +75,28 @@ class ReasoningAgent:
         
         self.graph = builder.compile()
 
+    async def aclose(self):
+        """Releases the retriever's Neo4j connections; call it on the loop the agent ran on."""
+        await self.retriever.aclose()
+
+    async def warmup(self, query: str = "hello"):
+        """Pushes one throwaway query through the graph so clients, connection pools and caches are hot."""
+        try:
+            await self.graph.ainvoke(self._initial_state(query))
+        except Exception as e:
+            print(f"Warm-up query failed: {e}")
+
+    def embed(self, query: str) -> List[float]:
+        """Embeds a query with the same model the retriever uses for vector search."""
+        return self.retriever.embed_query(query)
+
     async def plan_node(self, state: AgentState):
         """Gemini 3 decomposes the query."""
         print("--- PLAN ---")
-        prompt = f"Break down this query into 2-3 step-by-step search tasks: {state['query']}"
+        prompt = PLAN_PROMPT.format_messages(query=state['query'])
+        start_time = time.perf_counter()
         response = await self.llm.ainvoke(prompt)
+        llm_time = time.perf_counter() - start_time
         
         # Store the raw content for display
         raw_plan = response.content
@@ -70,55 +118,119 @@ class ReasoningAgent:
         event = {
             "type": "plan_created",
             "timestamp": datetime.now().isoformat(),
-            "plan": raw_plan  # Store as single string instead of list
+            "plan": raw_plan,  # Store as single string instead of list
+            "execution_time": llm_time
         }
         
         return {"plan": steps, "current_step": 0, "execution_events": [event]}
 
-    async def tool_node(self, state: AgentState):
-        """Executes the current step using Hybrid Retriever."""
-        print("--- TOOL ---")
-        step_idx = state.get("current_step", 0)
-        if step_idx >= len(state["plan"]):
-            return {"context": [], "execution_events": []} # Should probably go to synthesis
-
-        current_task = state["plan"][step_idx]
-        print(f"Executing: {current_task}")
-        
-        # Decide Local vs Global (simplified: just do Hybrid)
-        # Result is now a List[Dict] containing structured docs with metadata
-        results, metadata_list = await self.retriever.retrieve(current_task)
-        
-        # Emit tool events for each retrieval method
+    def _tool_events(self, metadata_list: List[Dict[str, Any]], step_idx: int) -> List[Dict[str, Any]]:
+        """Converts retriever metadata into tool_call execution events."""
         events = []
         for metadata in metadata_list:
             event = {
                 "type": "tool_call",
-                "tool_name": "vector_search" if "vector" in str(metadata.get("cypher", "")) else "community_search",
+                "step": step_idx,
+                "tool_name": metadata.get("tool_name") or ("vector_search" if "vector" in str(metadata.get("cypher", "")) else "community_search"),
                 "query": metadata.get("query", ""),
                 "cypher": metadata.get("cypher", ""),
                 "result_count": metadata.get("result_count", 0),
                 "execution_time": metadata.get("execution_time", 0),
+                "embed_time": metadata.get("embed_time", 0),
                 "timestamp": metadata.get("timestamp", datetime.now().isoformat())
             }
             if "error" in metadata:
                 event["error"] = metadata["error"]
             events.append(event)
+        return events
+
+    @staticmethod
+    def _dedupe_context(results: List[Dict], existing: List[Dict]) -> List[Dict]:
+        """Drops chunks already in context (or repeated within `results`), keyed by metadata.node_id."""
+        seen = {c.get("metadata", {}).get("node_id") for c in existing} - {None}
+        unique = []
+        for doc in results:
+            node_id = doc.get("metadata", {}).get("node_id")
+            if node_id is not None:
+                if node_id in seen:
+                    continue
+                seen.add(node_id)
+            unique.append(doc)
+        return unique
+
+    async def tool_node(self, state: AgentState):
+        """Executes the current step (or, with parallel_steps, every remaining step) using Hybrid Retriever."""
+        print("--- TOOL ---")
+        step_idx = state.get("current_step", 0)
+        if step_idx >= len(state["plan"]):
+            return {"context": [], "execution_events": []} # Should probably go to synthesis
+
+        # By default one step runs per pass, so a "NO" reflection leads to the next step's retrieval.
+        # parallel_steps (opt-in) fetches every remaining step at once; that is faster, but the plan
+        # is treated as independent searches and reflection has no further step to retry with.
+        step_indices = list(range(step_idx, len(state["plan"]))) if self.config.parallel_steps else [step_idx]
+        for idx in step_indices:
+            print(f"Executing: {state['plan'][idx]}")
+        
+        # Reranking pulls a wider candidate pool and keeps only the best chunks
+        rerank_enabled = state.get("rerank_enabled", self.config.rerank_enabled) and not self.reranker.should_skip(state["query"])
+        k = max(self.config.top_k, self.config.rerank_candidates) if rerank_enabled else self.config.top_k
+        
+        # Decide Local vs Global (simplified: just do Hybrid)
+        # Result is now a List[Dict] containing structured docs with metadata
+        start_time = time.perf_counter()
+        # Community summaries are the same for every step, so only the turn's first retrieval fetches them
+        first_pass = not any(e.get("tool_name") == "community_search" for e in state["execution_events"])
+        step_outputs = await asyncio.gather(*[
+            self.retriever.retrieve(state["plan"][idx], k=k, include_communities=first_pass and i == 0)
+            for i, idx in enumerate(step_indices)
+        ])
+        wall_time = time.perf_counter() - start_time
+        
+        # Emit tool events for each retrieval method
+        results, events = [], []
+        for idx, (step_results, metadata_list) in zip(step_indices, step_outputs):
+            results.extend(step_results)
+            events.extend(self._tool_events(metadata_list, idx))
+        results = self._dedupe_context(results, state["context"])
+        
+        if len(step_indices) > 1:
+            events.append({
+                "type": "tool_batch",
+                "steps": len(step_indices),
+                "wall_time": wall_time,
+                "summed_time": sum(e["execution_time"] for e in events),
+                "timestamp": datetime.now().isoformat()
+            })
+        
+        if rerank_enabled and results:
+            start_time = time.perf_counter()
+            event = {"type": "rerank", "candidates": len(results)}
+            try:
+                results = await run_blocking(
+                    self.reranker.rerank, state["query"], results, self.config.rerank_top_n
+                )
+            except Exception as e:
+                print(f"Reranking failed, keeping retrieval order: {e}")
+                event["error"] = str(e)
+            event.update({
+                "kept": len(results),
+                "execution_time": time.perf_counter() - start_time,
+                "timestamp": datetime.now().isoformat()
+            })
+            events.append(event)
         
-        return {"context": results, "execution_events": events}
+        # Reflection advances current_step by one, so point it at the last step executed
+        return {"context": results, "current_step": step_indices[-1], "execution_events": events}
 
     async def reflect_node(self, state: AgentState):
         """Reflects on whether we have enough info."""
         print("--- REFLECT ---")
         context_str = "\n".join([f"[{c.get('source', 'UNKNOWN').upper()}] {c.get('content', '')}" for c in state["context"]])
-        prompt = f"""
-        Query: {state['query']}
-        Current Context: {context_str}
-        
-        Do we have enough information to answer the query? 
-        Reply YES or NO.
-        """
+        prompt = REFLECTION_PROMPT.format_messages(query=state['query'], context=context_str)
+        start_time = time.perf_counter()
         response = await self.llm.ainvoke(prompt)
+        llm_time = time.perf_counter() - start_time
         reflection = response.content.strip().upper()
         
         # Emit event
@@ -126,7 +238,8 @@ class ReasoningAgent:
             "type": "reflection",
             "timestamp": datetime.now().isoformat(),
             "decision": reflection,
-            "context_count": len(state["context"])
+            "context_count": len(state["context"]),
+            "execution_time": llm_time
         }
         
         return {"reflection": reflection, "current_step": state["current_step"] + 1, "execution_events": [event]}
@@ -141,26 +254,17 @@ class ReasoningAgent:
         """Generates the final answer."""
         print("--- SYNTHESIS ---")
         context_str = "\n".join([f"[{i+1}] {c.get('content', '')}" for i, c in enumerate(state["context"])])
-        prompt = f"""
-        Answer the query based strictly on the context provided below.
-        
-        IMPORTANT: When you reference information from a source, add a citation marker like [1], [2], etc. 
-        The numbers correspond to the source numbers below.
-        
-        Query: {state['query']}
-        
-        Context:
-        {context_str}
-        
-        Provide a comprehensive answer with inline citations.
-        """
+        prompt = SYNTHESIS_PROMPT.format_messages(query=state['query'], context=context_str)
+        start_time = time.perf_counter()
         response = await self.llm.ainvoke(prompt)
+        llm_time = time.perf_counter() - start_time
         
         # Emit event
         event = {
             "type": "final_answer",
             "timestamp": datetime.now().isoformat(),
-            "answer_length": len(response.content)
+            "answer_length": len(response.content),
+            "execution_time": llm_time
         }
         
         return {"answer": response.content, "execution_events": [event]}
@@ -182,18 +286,7 @@ class ReasoningAgent:
         
         entities = list(set(entities))[:10]  # Deduplicate and limit
         
-        prompt = f"""Based on this medical research answer and the entities discovered, generate 3 follow-up questions that would help explore the knowledge graph deeper.
-
-Answer: {answer[:500]}...
-
-Key Entities: {', '.join(entities)}
-
-Generate questions that:
-1. Explore related biological pathways or mechanisms
-2. Find connections to other diseases or conditions  
-3. Discover recent research trends or contradictory findings
-
-Return ONLY the questions, one per line, without numbering."""
+        prompt = FOLLOWUP_PROMPT.format_messages(answer=answer[:500], entities=', '.join(entities))
 
         try:
             response = await self.llm.ainvoke(prompt)
@@ -203,8 +296,8 @@ Return ONLY the questions, one per line, without numbering."""
             print(f"Failed to generate follow-ups: {e}")
             return []
 
-    async def run(self, query: str):
-        inputs = {
+    def _initial_state(self, query: str, rerank_enabled: Optional[bool] = None) -> AgentState:
+        return {
             "query": query, 
             "plan": [], 
             "current_step": 0, 
@@ -212,10 +305,12 @@ Return ONLY the questions, one per line, without numbering."""
             "answer": "", 
             "reflection": "",
             "execution_events": [],
-            "execution_summary": {}
+            "execution_summary": {},
+            "rerank_enabled": self.config.rerank_enabled if rerank_enabled is None else rerank_enabled
         }
-        result = await self.graph.ainvoke(inputs)
-        
+
+    async def _finalize(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Adds the execution summary and follow-up suggestions to a finished graph state."""
         # Compute execution summary
         tool_events = [e for e in result.get("execution_events", []) if e.get("type") == "tool_call"]
         total_results = sum(e.get("result_count", 0) for e in tool_events)
@@ -233,3 +328,33 @@ Return ONLY the questions, one per line, without numbering."""
         
         return result
 
+    async def run(self, query: str):
+        result = await self.graph.ainvoke(self._initial_state(query))
+        return await self._finalize(result)
+
+    async def astream(self, query: str, rerank_enabled: Optional[bool] = None):
+        """
+        Streams the reasoning trace while the graph is still running.
+        Yields each execution event as soon as its node finishes, answer token deltas
+        from the synthesis node as {"type": "answer_token", "content": ...}, and finally
+        {"type": "result", "result": ...} carrying the same dict run() returns.
+        `rerank_enabled` overrides the configured reranking for this query.
+        """
+        state = self._initial_state(query, rerank_enabled)
+        emitted = 0
+        
+        async for mode, chunk in self.graph.astream(state, stream_mode=["values", "messages"]):
+            if mode == "messages":
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == "synthesis" and isinstance(message.content, str) and message.content:
+                    yield {"type": "answer_token", "content": message.content}
+                continue
+            
+            # "values" carries the full state after each node; only forward the new events
+            state = chunk
+            events = state.get("execution_events", [])
+            for event in events[emitted:]:
+                yield event
+            emitted = len(events)
+        
+        yield {"type": "result", "result": await self._finalize(state)}
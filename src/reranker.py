@@ -0,0 +1,91 @@
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Quoted literals and bare filenames are exact lookups; reranking them only adds latency
+LITERAL_QUERY_PATTERN = re.compile(r'^"[^"]+"$|^[\w\-. ]+\.(md|pdf|txt)$', re.IGNORECASE)
+
+
+class CrossEncoderReranker:
+    """
+    Reorders retrieved chunks with a cross-encoder (bge-reranker-v2-m3 by default).
+    The model is loaded on first use; scores are cached per (query, chunk) digest
+    for `ttl_seconds` so repeated retrievals of the same chunk are free.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "BAAI/bge-reranker-v2-m3",
+        use_fp16: bool = True,
+        batch_size: int = 32,
+        max_cache_entries: int = 10_000,
+        ttl_seconds: float = 900,
+    ):
+        self.model_name = model_name
+        self.use_fp16 = use_fp16
+        self.batch_size = batch_size
+        self.max_cache_entries = max_cache_entries
+        self.ttl_seconds = ttl_seconds
+        self._model = None
+        self._scores: "OrderedDict[Tuple[str, str], Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _ensure_model(self):
+        """Lazy import of FlagEmbedding, which pulls in torch."""
+        if self._model is None:
+            try:
+                from FlagEmbedding import FlagReranker
+            except ImportError as e:
+                raise ImportError(f"Failed to import FlagEmbedding: {e}. Install the 'rerank' extra to enable reranking.")
+            self._model = FlagReranker(self.model_name, use_fp16=self.use_fp16)
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def should_skip(query: str) -> bool:
+        return bool(LITERAL_QUERY_PATTERN.match(query.strip()))
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        query_digest = self._digest(query)
+        keys = [(query_digest, self._digest(text)) for text in texts]
+        scores: List[Optional[float]] = [None] * len(texts)
+        now = time.time()
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._scores.get(key)
+                if cached is not None and cached[1] > now:
+                    scores[i] = cached[0]
+                    self._scores.move_to_end(key)
+
+        missing = [i for i, s in enumerate(scores) if s is None]
+        if missing:
+            self._ensure_model()
+            new_scores = self._model.compute_score(
+                [(query, texts[i]) for i in missing],
+                batch_size=self.batch_size
+            )
+            # compute_score returns a bare float for a single pair
+            if not isinstance(new_scores, list):
+                new_scores = [new_scores]
+
+            expires_at = time.time() + self.ttl_seconds
+            with self._lock:
+                for i, value in zip(missing, new_scores):
+                    scores[i] = float(value)
+                    self._scores[keys[i]] = (float(value), expires_at)
+                while len(self._scores) > self.max_cache_entries:
+                    self._scores.popitem(last=False)
+
+        return scores
+
+    def rerank(self, query: str, candidates: List[Dict], top_n: int) -> List[Dict]:
+        """Returns the `top_n` candidates by cross-encoder score, each tagged with `rerank_score`."""
+        scores = self.score(query, [c.get("content", "") for c in candidates])
+        ranked = sorted(zip(scores, candidates), key=lambda pair: pair[0], reverse=True)[:top_n]
+        return [{**candidate, "rerank_score": score} for score, candidate in ranked]
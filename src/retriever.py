@@ -1,19 +1,49 @@
+import os
 import asyncio
 import time
+import functools
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from .llm import get_embeddings, get_llm
 from .graph import Neo4jManager
+from .local_index import LocalChunkIndex
+from .executor import run_blocking
 from langchain_core.documents import Document as LangchainDocument
 
+# Exact-text query embeddings kept per retriever; repeats skip the embedding round trip
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+
 class HybridRetriever:
-    def __init__(self):
-        self.neo4j = Neo4jManager()
+    def __init__(self, top_k: int = 5, neo4j: Optional[Neo4jManager] = None):
+        self.top_k = top_k
+        # A shared manager (e.g. the app's cached one) is closed by its owner, not here
+        self._owns_neo4j = neo4j is None
+        self.neo4j = neo4j or Neo4jManager()
         self.embeddings = get_embeddings()
+        self._embed_cached = functools.lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)(self._embed_uncached)
         self.llm = get_llm()
         self.vector_index_name = "chunk_vector_index"
+        # Optional exported copy of the chunk embeddings (scripts/precompute_embeddings.py);
+        # when present, scoring runs locally and Neo4j only hydrates the top hits.
+        self.local_index = LocalChunkIndex.load(
+            os.getenv("RAG_LOCAL_INDEX_DIR", "data/index"),
+            precision=os.getenv("RAG_EMBED_PRECISION", "float16")
+        )
+
+    async def aclose(self):
+        """Closes the async Neo4j pool, and the sync one too when this retriever created the manager."""
+        await self.neo4j.aclose()
+        if self._owns_neo4j:
+            self.neo4j.close()
+
+    def _embed_uncached(self, query: str) -> Tuple[float, ...]:
+        return tuple(self.embeddings.embed_query(query))
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embeds a query, reusing the vector for text seen recently (the embedding client is synchronous)."""
+        return list(self._embed_cached(query))
 
-    def vector_search(self, query: str, k: int = 5) -> Tuple[List[Dict], Dict[str, Any]]:
+    async def vector_search(self, query: str, k: int = 5) -> Tuple[List[Dict], Dict[str, Any]]:
         """
         Local Search: Finds relevant text chunks using vector similarity.
         Returns: (results, metadata)
@@ -21,7 +51,8 @@ class HybridRetriever:
         start_time = time.time()
         
         # 1. Generate Query Embedding
-        query_embedding = self.embeddings.embed_query(query)
+        query_embedding = await run_blocking(self.embed_query, query)
+        embed_time = time.time() - start_time
         
         # 2. Run Neo4j Vector Query
         # Note: We assume the index exists (created via graph.py)
@@ -32,13 +63,24 @@ class HybridRetriever:
         RETURN node.content AS content, score, elementId(node) as id,
                d.title AS doc_title, s.title AS section_title, d.source AS source
         """
-        
-        with self.neo4j.driver.session() as session:
+        params = {"index_name": self.vector_index_name, "k": k, "embedding": query_embedding}
+        
+        if self.local_index is not None:
+            # Score against the local matrix; Neo4j just hydrates the hits in rank order
+            hits = await run_blocking(self.local_index.search, query_embedding, k)
+            cypher = """
+            UNWIND $hits AS hit
+            MATCH (node:Chunk) WHERE elementId(node) = hit.id
+            MATCH (node)-[:PART_OF]->(s:Section)-[:PART_OF]->(d:Document)
+            RETURN node.content AS content, hit.score AS score, elementId(node) as id,
+                   d.title AS doc_title, s.title AS section_title, d.source AS source
+            """
+            params = {"hits": [{"id": chunk_id, "score": score} for chunk_id, score in hits]}
+        
+        async with self.neo4j.async_driver.session(database=self.neo4j.database) as session:
             try:
-                result = session.run(cypher, 
-                                   index_name=self.vector_index_name, 
-                                   k=k, 
-                                   embedding=query_embedding)
+                result = await session.run(cypher, **params)
+                records = [r async for r in result]
                 results = [
                     {
                         "content": r["content"], 
@@ -51,15 +93,17 @@ class HybridRetriever:
                             "node_id": r["id"]
                         }
                     } 
-                    for r in result
+                    for r in records
                 ]
                 
                 execution_time = time.time() - start_time
                 metadata = {
+                    "tool_name": "vector_search",
                     "query": query,
                     "cypher": cypher,
                     "result_count": len(results),
                     "execution_time": execution_time,
+                    "embed_time": embed_time,
                     "timestamp": datetime.now().isoformat()
                 }
                 
@@ -68,10 +112,12 @@ class HybridRetriever:
                 print(f"Vector search failed: {e}")
                 execution_time = time.time() - start_time
                 metadata = {
+                    "tool_name": "vector_search",
                     "query": query,
                     "cypher": cypher,
                     "result_count": 0,
                     "execution_time": execution_time,
+                    "embed_time": embed_time,
                     "timestamp": datetime.now().isoformat(),
                     "error": str(e)
                 }
@@ -115,7 +161,7 @@ class HybridRetriever:
         # Placeholder for community summaries (requires pre-computation)
         # We will return mocked summary objects for now or raw entity lists
         
-        raw_communities = self.neo4j.get_community_summaries()
+        raw_communities = await self.neo4j.aget_community_summaries()
         # Filter mostly relevant ones?
         # For prototype, simply return a text describing the top communities found via vector search connection
         
@@ -126,6 +172,7 @@ class HybridRetriever:
         
         execution_time = time.time() - start_time
         metadata = {
+            "tool_name": "community_search",
             "query": query,
             "cypher": cypher,
             "result_count": len(results),
@@ -135,18 +182,25 @@ class HybridRetriever:
         
         return results, metadata
 
-    async def retrieve(self, query: str) -> Tuple[List[Dict], List[Dict[str, Any]]]:
+    async def retrieve(
+        self, query: str, k: int = None, include_communities: bool = True
+    ) -> Tuple[List[Dict], List[Dict[str, Any]]]:
         """
         Combines Local and Global search results.
+        `k` overrides the number of vector hits (defaults to top_k). Community summaries
+        do not depend on the query yet, so callers fetch them once per question
+        and pass include_communities=False for later steps.
         Returns: (all_docs, metadata_list)
         """
-        # Run in parallel
-        # Note: retrieve_communities is async, vector_search is sync (neo4j driver)
-        # We wrap vector_search
-        
-        loop = asyncio.get_event_loop()
-        local_results, local_metadata = await loop.run_in_executor(None, self.vector_search, query)
-        global_results, global_metadata = await self.retrieve_communities(query)
+        if not include_communities:
+            local_results, local_metadata = await self.vector_search(query, k or self.top_k)
+            return local_results, [local_metadata]
+
+        # Run in parallel on the shared async Neo4j pool
+        (local_results, local_metadata), (global_results, global_metadata) = await asyncio.gather(
+            self.vector_search(query, k or self.top_k),
+            self.retrieve_communities(query)
+        )
         
         # Combine and format
         all_docs = local_results + global_results
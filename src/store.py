@@ -0,0 +1,125 @@
+import json
+import time
+from array import array
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from .cache import cache_key
+
+
+class ConversationStore:
+    """
+    SQLite persistence for chat history, finished agent results and per-query timings,
+    so conversations and the answer cache survive tab closes and restarts.
+    One connection is shared across Streamlit sessions, guarded by a lock.
+    With `max_age_seconds` set, cached results, their query embeddings and timings
+    older than that are pruned on open and whenever a result is written.
+    """
+
+    def __init__(self, path: str = "data/medgraph.db", max_age_seconds: Optional[float] = None):
+        self.max_age_seconds = max_age_seconds
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS messages(session TEXT, role TEXT, content TEXT, ts REAL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages(session, ts)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache(qhash TEXT PRIMARY KEY, query TEXT, result TEXT, ts REAL, variant TEXT DEFAULT '')"
+            )
+            # Databases created before results were keyed by variant lack the column
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache)")}
+            if "variant" not in columns:
+                self._conn.execute("ALTER TABLE cache ADD COLUMN variant TEXT DEFAULT ''")
+            # Query embeddings for the semantic cache; results are shared with the cache table
+            self._conn.execute("CREATE TABLE IF NOT EXISTS query_embeddings(qhash TEXT PRIMARY KEY, vector BLOB)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS timings(
+                    session TEXT, query TEXT, cached INTEGER, t_embed_ms REAL, t_search_ms REAL,
+                    t_rerank_ms REAL, t_llm_ms REAL, total_ms REAL, ts REAL
+                )
+            """)
+        self.prune()
+
+    def add_message(self, session: str, role: str, content: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO messages(session, role, content, ts) VALUES (?, ?, ?, ?)",
+                (session, role, content, time.time())
+            )
+
+    def load_messages(self, session: str) -> List[Dict[str, str]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE session = ? ORDER BY ts", (session,)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def clear_messages(self, session: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE session = ?", (session,))
+
+    def put_result(self, query: str, result: Dict[str, Any], variant: str = ""):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache(qhash, query, result, ts, variant) VALUES (?, ?, ?, ?, ?)",
+                (cache_key(query, variant), query, json.dumps(result, default=str), time.time(), variant)
+            )
+        self.prune()
+
+    def prune(self):
+        """Deletes cache, query embedding and timing rows older than `max_age_seconds`; a no-op when unset."""
+        if self.max_age_seconds is None:
+            return
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE ts <= ?", (cutoff,))
+            # Embeddings have no timestamp of their own; they live exactly as long as their result
+            self._conn.execute("DELETE FROM query_embeddings WHERE qhash NOT IN (SELECT qhash FROM cache)")
+            self._conn.execute("DELETE FROM timings WHERE ts <= ?", (cutoff,))
+
+    def recent_results(
+        self, max_age_seconds: float, limit: int = 100
+    ) -> List[Tuple[str, str, Dict[str, Any], float]]:
+        """Most recent (query, variant, result, ts) rows younger than `max_age_seconds`, newest first; used to warm the in-memory cache."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT query, variant, result, ts FROM cache WHERE ts > ? ORDER BY ts DESC LIMIT ?",
+                (time.time() - max_age_seconds, limit)
+            ).fetchall()
+        return [(query, variant, json.loads(result), ts) for query, variant, result, ts in rows]
+
+    def put_query_embedding(self, query: str, vector: List[float], variant: str = ""):
+        """Stores the embedding of a query whose result was saved with put_result (float32 bytes)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings(qhash, vector) VALUES (?, ?)",
+                (cache_key(query, variant), array("f", vector).tobytes())
+            )
+
+    def recent_embedded_results(
+        self, max_age_seconds: float, limit: int = 1000
+    ) -> List[Tuple[str, str, List[float], Dict[str, Any], float]]:
+        """Most recent (query, variant, embedding, result, ts) rows younger than `max_age_seconds`, newest first; warms the semantic cache."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT c.query, c.variant, e.vector, c.result, c.ts FROM cache c
+                JOIN query_embeddings e ON e.qhash = c.qhash
+                WHERE c.ts > ? ORDER BY c.ts DESC LIMIT ?
+                """,
+                (time.time() - max_age_seconds, limit)
+            ).fetchall()
+        return [
+            (query, variant, array("f", vector).tolist(), json.loads(result), ts)
+            for query, variant, vector, result, ts in rows
+        ]
+
+    def log_timings(self, session: str, query: str, cached: bool, timings: Dict[str, float]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO timings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (session, query, int(cached), timings.get("t_embed_ms", 0), timings.get("t_search_ms", 0),
+                 timings.get("t_rerank_ms", 0), timings.get("t_llm_ms", 0), timings.get("total_ms", 0), time.time())
+            )
@@ -0,0 +1,81 @@
+import ast
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+
+APP_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app.py'))
+
+
+def _app_source():
+    with open(APP_PATH, encoding="utf-8") as f:
+        return f.read()
+
+
+def _load_app_definitions(*names):
+    """
+    Executes just the named top-level definitions from app.py (decorators dropped),
+    so pure helpers can be exercised without starting Streamlit, Neo4j or the agent.
+    """
+    tree = ast.parse(_app_source())
+    nodes = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in names:
+            if isinstance(node, ast.FunctionDef):
+                node.decorator_list = []
+            nodes.append(node)
+        elif isinstance(node, ast.Assign) and any(getattr(t, "id", None) in names for t in node.targets):
+            nodes.append(node)
+    namespace = {"json": json, "re": re, "dataclass": dataclass, "asdict": asdict}
+    exec(compile(ast.Module(body=nodes, type_ignores=[]), APP_PATH, "exec"), namespace)
+    missing = set(names) - set(namespace)
+    assert not missing, f"app.py no longer defines {missing}"
+    return namespace
+
+
+# Execution events as ReasoningAgent streams them
+EVENTS = [
+    {"type": "plan_created", "plan": "1. Define hypertension\n2. List treatments", "timestamp": "t0", "execution_time": 0.5},
+    {"type": "tool_call", "tool_name": "vector_search", "execution_time": 0.3, "embed_time": 0.1, "result_count": 4},
+    {"type": "rerank", "candidates": 8, "kept": 4, "execution_time": 0.05},
+    {"type": "reflection", "decision": "YES", "context_count": 4, "execution_time": 0.4},
+    {"type": "final_answer", "answer_length": 120, "timestamp": "t1", "execution_time": 1.2},
+]
+
+
+def test_single_streamlit_entry_point():
+    root = os.path.dirname(APP_PATH)
+    copies = [name for name in os.listdir(root) if name.startswith("app") and name.endswith(".py")]
+    assert copies == ["app.py"]
+
+
+def test_plan_and_answer_sections_render_from_execution_events():
+    app = _load_app_definitions("format_plan_markdown", "format_answer_markdown")
+    plan_events = [e for e in EVENTS if e["type"] == "plan_created"]
+    answer_events = [e for e in EVENTS if e["type"] == "final_answer"]
+
+    plan_md = app["format_plan_markdown"](json.dumps(plan_events))
+    assert "1. Define hypertension\n2. List treatments" in plan_md
+    assert "t0" in plan_md
+    # Plans streamed as a list of steps (older agent versions) are joined line by line
+    legacy_md = app["format_plan_markdown"](json.dumps([{"plan": ["step a", "step b"]}]))
+    assert "step a\nstep b" in legacy_md
+
+    answer_md = app["format_answer_markdown"](json.dumps(answer_events))
+    assert "120 characters" in answer_md
+
+
+def test_timings_split_phases_from_execution_events():
+    app = _load_app_definitions("Timings")
+    timings = app["Timings"].from_events(EVENTS, total_ms=3000)
+    assert timings.t_embed_ms == 100.0
+    assert timings.t_search_ms == 200.0
+    assert timings.t_rerank_ms == 50.0
+    assert timings.t_llm_ms == 2100.0
+    assert timings.total_ms == 3000.0
+
+
+def test_parse_citations():
+    app = _load_app_definitions("CITATION_PATTERN", "parse_citations")
+    assert app["parse_citations"]("Lowers pressure [2], see also [1] and [2].") == [1, 2]
+    assert app["parse_citations"]("No sources.") == []
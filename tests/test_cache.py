@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.cache import SemanticCache, SmartRAGCache, cache_key
+
+
+def _unit(dim, hot):
+    vec = np.zeros(dim, dtype=np.float32)
+    vec[hot] = 1.0
+    return vec
+
+
+def test_cache_key_normalizes_and_separates_variants():
+    assert cache_key("What is Hypertension?") == cache_key("  what is   hypertension ")
+    assert cache_key("what is hypertension", "rerank") != cache_key("what is hypertension", "no-rerank")
+
+
+def test_smart_cache_hit_and_miss():
+    cache = SmartRAGCache()
+    cache.put("what is hypertension", {"answer": "high blood pressure"})
+    assert cache.get("What is hypertension?") == {"answer": "high blood pressure"}
+    assert cache.get("what is diabetes") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_smart_cache_variants_do_not_collide():
+    cache = SmartRAGCache()
+    cache.put("q", {"answer": "reranked"}, variant="rerank")
+    assert cache.get("q", variant="no-rerank") is None
+    assert cache.get("q", variant="rerank") == {"answer": "reranked"}
+
+
+def test_smart_cache_ttl_expiry_uses_stored_at():
+    cache = SmartRAGCache(ttl_seconds=900)
+    cache.put("fresh", {"answer": 1})
+    cache.put("restored", {"answer": 2}, stored_at=time.time() - 1000)
+    assert cache.get("fresh") == {"answer": 1}
+    assert cache.get("restored") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_smart_cache_evicts_least_recently_used_past_max_bytes():
+    value = {"answer": "x" * 100}
+    size = SmartRAGCache._estimate_size(value)
+    cache = SmartRAGCache(max_bytes=size * 3)
+    for query in ("a", "b", "c"):
+        cache.put(query, value)
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("d", value)
+    assert cache.get("b") is None
+    assert all(cache.get(query) is not None for query in ("a", "c", "d"))
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size_bytes"] == size * 3
+
+
+def test_smart_cache_keeps_oversized_entry():
+    cache = SmartRAGCache(max_bytes=1)
+    cache.put("big", {"answer": "x" * 100})
+    assert cache.get("big") is not None
+
+
+def test_semantic_cache_threshold():
+    cache = SemanticCache(threshold=0.95)
+    stored = _unit(64, 0)
+    cache.put(stored, "what is hypertension", {"answer": "high blood pressure"})
+
+    near = stored.copy()
+    near[1] = 0.01
+    value, similarity = cache.get(near)
+    assert value == {"answer": "high blood pressure"}
+    assert similarity > 0.99
+
+    assert cache.get(_unit(64, 1)) is None
+    # A per-call threshold overrides the default
+    assert cache.get(near, threshold=0.99999) is None
+    assert cache.get(near, threshold=0.99) is not None
+
+
+def test_semantic_cache_expiry_and_variants():
+    cache = SemanticCache(ttl_seconds=900)
+    vec = _unit(32, 3)
+    cache.put(vec, "old", {"answer": "old"}, stored_at=time.time() - 1000)
+    assert cache.get(vec) is None
+    assert cache.stats()["entries"] == 0
+
+    cache.put(vec, "q", {"answer": "reranked"}, variant="rerank")
+    assert cache.get(vec, variant="no-rerank") is None
+    assert cache.get(vec, variant="rerank")[0] == {"answer": "reranked"}
+
+
+def test_semantic_cache_evicts_past_max_entries():
+    cache = SemanticCache(max_entries=2)
+    for i in range(3):
+        cache.put(_unit(16, i), f"q{i}", {"answer": i})
+    assert cache.get(_unit(16, 0)) is None
+    assert cache.get(_unit(16, 2))[0] == {"answer": 2}
+    assert cache.stats()["evictions"] == 1
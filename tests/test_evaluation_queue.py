@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.evaluation import EvaluationQueue
+
+
+class CountingEvaluator:
+    """Scores every sample 0.9/0.8 and counts how many were sent to it."""
+
+    def __init__(self):
+        self.scored = 0
+
+    def evaluate_batch(self, questions, answers, contexts):
+        self.scored += len(questions)
+        return pd.DataFrame([{"faithfulness": 0.9, "answer_relevancy": 0.8}] * len(questions))
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.entries = []
+
+    def log_evaluation(self, question, answer, contexts, metrics, metadata=None):
+        self.entries.append((question, metrics))
+
+
+def _wait_for(queue, turn_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = queue.result(turn_id)
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    raise AssertionError(f"turn {turn_id} was never scored")
+
+
+def test_repeated_turns_reuse_scores():
+    evaluator = CountingEvaluator()
+    queue = EvaluationQueue(evaluator, max_wait_seconds=0.01)
+    queue.submit("t1", question="q", answer="a", contexts=["ctx"])
+    assert _wait_for(queue, "t1") == {"faithfulness": 0.9, "answer_relevancy": 0.8}
+
+    queue.submit("t2", question="q", answer="a", contexts=["ctx"])
+    assert queue.result("t2") == {"faithfulness": 0.9, "answer_relevancy": 0.8}
+    assert evaluator.scored == 1
+
+
+def test_turns_without_context_are_skipped_and_logged():
+    evaluator = CountingEvaluator()
+    logger = RecordingLogger()
+    queue = EvaluationQueue(evaluator, logger)
+    queue.submit("t1", question="q", answer="a", contexts=["", "  "], log=True)
+    queue.submit("t2", question="q", answer=" ", contexts=["ctx"], log=True)
+
+    assert queue.result("t1")["skipped"] == "no contexts"
+    assert queue.result("t2")["skipped"] == "blank answer"
+    assert queue.result("t1")["faithfulness"] == 0.0
+    assert [metrics["skipped"] for _, metrics in logger.entries] == ["no contexts", "blank answer"]
+    assert evaluator.scored == 0
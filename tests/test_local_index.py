@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.local_index import (
+    INT8_MATRIX_FILE,
+    INT8_SCALES_FILE,
+    LocalChunkIndex,
+    create_chunk_matrix,
+    normalize_rows,
+    quantize,
+    write_chunk_index,
+)
+
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(0)
+    return normalize_rows(rng.standard_normal((200, 48)))
+
+
+def test_quantize_round_trip_error_is_within_half_a_step(matrix):
+    quantized, scales = quantize(matrix)
+    assert quantized.dtype == np.int8
+    assert scales.dtype == np.float32
+    restored = quantized.astype(np.float32) * scales[:, None]
+    assert np.all(np.abs(restored - matrix) <= scales[:, None] / 2 + 1e-6)
+
+
+def test_quantize_zero_row_keeps_unit_scale():
+    quantized, scales = quantize(np.zeros((1, 4)))
+    assert scales[0] == 1
+    assert not quantized.any()
+
+
+def test_float16_search_returns_exact_neighbour_first(matrix):
+    ids = [f"chunk-{i}" for i in range(len(matrix))]
+    index = LocalChunkIndex(ids, matrix.astype(np.float16))
+    results = index.search(matrix[17] * 3, k=5)
+    assert len(results) == 5
+    assert results[0][0] == "chunk-17"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-2)
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+
+def test_int8_search_matches_float_scores(matrix):
+    ids = [f"chunk-{i}" for i in range(len(matrix))]
+    quantized, scales = quantize(matrix)
+    index = LocalChunkIndex(ids, quantized, scales=scales)
+    results = index.search(matrix[42], k=3)
+    assert results[0][0] == "chunk-42"
+    for chunk_id, score in results:
+        exact = float(matrix[int(chunk_id.split("-")[1])] @ matrix[42])
+        assert score == pytest.approx(exact, abs=0.03)
+
+
+def test_search_clamps_k(matrix):
+    ids = [f"chunk-{i}" for i in range(5)]
+    index = LocalChunkIndex(ids, matrix[:5].astype(np.float16))
+    assert len(index.search(matrix[0], k=50)) == 5
+    assert index.search(matrix[0], k=0) == []
+
+
+def test_load_missing_index_returns_none(tmp_path):
+    assert LocalChunkIndex.load(tmp_path) is None
+
+
+def test_load_exported_index(tmp_path, matrix):
+    ids = [f"chunk-{i}" for i in range(len(matrix))]
+    mmap = create_chunk_matrix(tmp_path, *matrix.shape)
+    mmap[:] = matrix
+    mmap.flush()
+    write_chunk_index(tmp_path, ids, matrix.shape)
+
+    index = LocalChunkIndex.load(tmp_path)
+    assert index.scales is None
+    assert index.search(matrix[3], k=1)[0][0] == "chunk-3"
+
+    # Without an int8 export, precision="int8" falls back to the float16 matrix
+    assert LocalChunkIndex.load(tmp_path, precision="int8").scales is None
+
+    quantized, scales = quantize(matrix)
+    int8_mmap = create_chunk_matrix(tmp_path, *matrix.shape, dtype=np.int8)
+    int8_mmap[:] = quantized
+    int8_mmap.flush()
+    np.save(tmp_path / INT8_SCALES_FILE, scales)
+    assert (tmp_path / INT8_MATRIX_FILE).exists()
+
+    index = LocalChunkIndex.load(tmp_path, precision="int8")
+    assert index.matrix.dtype == np.int8
+    assert index.search(matrix[3], k=1)[0][0] == "chunk-3"
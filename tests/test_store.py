@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.store import ConversationStore
+
+
+def test_messages_round_trip(tmp_path):
+    store = ConversationStore(str(tmp_path / "medgraph.db"))
+    store.add_message("s1", "user", "What is hypertension?")
+    store.add_message("s1", "assistant", "High blood pressure.")
+    store.add_message("s2", "user", "Other session")
+    assert store.load_messages("s1") == [
+        {"role": "user", "content": "What is hypertension?"},
+        {"role": "assistant", "content": "High blood pressure."},
+    ]
+    store.clear_messages("s1")
+    assert store.load_messages("s1") == []
+
+
+def test_results_are_keyed_by_variant(tmp_path):
+    store = ConversationStore(str(tmp_path / "medgraph.db"))
+    store.put_result("q", {"answer": "reranked"}, variant="rerank")
+    store.put_result("q", {"answer": "plain"}, variant="no-rerank")
+    store.put_query_embedding("q", [1.0, 0.0], variant="rerank")
+
+    rows = store.recent_results(max_age_seconds=900)
+    assert {(query, variant, result["answer"]) for query, variant, result, _ in rows} == {
+        ("q", "rerank", "reranked"),
+        ("q", "no-rerank", "plain"),
+    }
+    embedded = store.recent_embedded_results(max_age_seconds=900)
+    assert [(query, variant, vector) for query, variant, vector, _, _ in embedded] == [("q", "rerank", [1.0, 0.0])]
+
+
+def test_prune_drops_rows_older_than_max_age(tmp_path):
+    store = ConversationStore(str(tmp_path / "medgraph.db"), max_age_seconds=900)
+    store.put_result("old", {"answer": 1})
+    store.put_query_embedding("old", [1.0])
+    store.log_timings("s1", "old", False, {"total_ms": 10})
+    # Backdate everything past the TTL, then write a fresh result
+    with store._conn:
+        store._conn.execute("UPDATE cache SET ts = ?", (time.time() - 1000,))
+        store._conn.execute("UPDATE timings SET ts = ?", (time.time() - 1000,))
+    store.put_result("new", {"answer": 2})
+
+    assert [query for query, _, _, _ in store.recent_results(max_age_seconds=10_000)] == ["new"]
+    assert store._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0] == 0
+    assert store._conn.execute("SELECT COUNT(*) FROM timings").fetchone()[0] == 0